@@ -4,3 +4,4 @@ from . import models
 admin.site.register(models.Service)
 admin.site.register(models.StreamingServiceAccount)
 admin.site.register(models.ScreenSubscription)
+admin.site.register(models.ReconciliationCheckpoint)
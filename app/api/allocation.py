@@ -0,0 +1,319 @@
+"""
+Screen allocation
+"""
+
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import caching
+from . import models
+
+FREE_SCREEN = Q(is_active=True, user__isnull=True)
+
+# Accounts tried by a claim, and free screens per account on SQLite, before giving up.
+CLAIM_ATTEMPTS = 5
+
+# Lock that makes reading and advancing the round robin cursor a single step.
+TURN_LOCK_TIMEOUT = 5
+TURN_WAIT_INTERVAL = 0.005
+TURN_WAIT_ATTEMPTS = 40
+
+RECONCILE_BATCH_SIZE = 1000
+RECONCILE_OVERLAP = timedelta(minutes=1)
+
+STRATEGIES = {}
+
+
+def register(strategy_class):
+    STRATEGIES[strategy_class.name] = strategy_class
+    return strategy_class
+
+
+def get_strategy(service=None):
+    """Strategy configured for service, or best fit across every service."""
+    if service is None:
+        return BestFit()
+    return STRATEGIES[service.allocation_strategy](service)
+
+
+class AllocationStrategy:
+    """
+    Decides which accounts get their screens filled first.
+
+    Accounts with free screens are sorted by ordering through the service indexes; the first
+    one is filled next and every account tied with it on the first field is offered.
+    """
+
+    name = None
+    ordering = ()
+
+    def __init__(self, service=None):
+        self.service = service
+
+    def accounts(self, accounts=None):
+        if accounts is None:
+            accounts = models.StreamingServiceAccount.objects.all()
+        if self.service is not None:
+            accounts = accounts.filter(service=self.service)
+        return accounts.filter(available_screens__gt=0)
+
+    def pick(self, accounts=None):
+        """Next account to fill."""
+        return self.accounts(accounts).order_by(*self.ordering).first()
+
+    def offered_accounts(self, accounts=None):
+        open_accounts = self.accounts(accounts)
+        key = self.ordering[0].lstrip("-")
+        first = open_accounts.order_by(self.ordering[0]).values(key)[:1]
+        return open_accounts.filter(**{key: Subquery(first)})
+
+    def claim_account(self, accounts=None):
+        """Account the next claim fills, which is the next account to fill unless overridden."""
+        return self.pick(accounts)
+
+
+@register
+class BestFit(AllocationStrategy):
+    """Fill the accounts with the fewest free screens first."""
+
+    name = "best_fit"
+    ordering = ("available_screens", "pk")
+
+
+@register
+class Cheapest(AllocationStrategy):
+    """Fill the accounts with the lowest price_per_screen first."""
+
+    name = "cheapest"
+    ordering = ("price_per_screen", "pk")
+
+
+@register
+class SpreadEvenly(AllocationStrategy):
+    """Fill the accounts with the most free screens first."""
+
+    name = "spread"
+    ordering = ("-available_screens", "-pk")
+
+
+@register
+class RoundRobin(AllocationStrategy):
+    """Take turns over the accounts of the service, in id order."""
+
+    name = "round_robin"
+    ordering = ("pk",)
+
+    @property
+    def cursor_key(self):
+        return f"allocation:round_robin:{self.service.pk if self.service else 'all'}"
+
+    def pick(self, accounts=None):
+        ordered = self.accounts(accounts).order_by("pk")
+        return ordered.filter(pk__gt=cache.get(self.cursor_key, 0)).first() or ordered.first()
+
+    def offered_accounts(self, accounts=None):
+        account = self.pick(accounts)
+        return self.accounts(accounts).filter(pk=account.pk if account else None)
+
+    def claim_account(self, accounts=None):
+        """
+        Take the next turn, moving the cursor past the account before the claim is made.
+
+        The cursor is read and moved under a lock, so concurrent claimers get consecutive turns
+        rather than the same one. A claimer that cannot get the lock takes the turn without it.
+        """
+        lock_key = f"{self.cursor_key}:lock"
+        for _ in range(TURN_WAIT_ATTEMPTS):
+            if cache.add(lock_key, True, TURN_LOCK_TIMEOUT):
+                try:
+                    account = self.pick(accounts)
+                    if account is not None:
+                        cache.set(self.cursor_key, account.pk, None)
+                    return account
+                finally:
+                    cache.delete(lock_key)
+            time.sleep(TURN_WAIT_INTERVAL)
+        return self.pick(accounts)
+
+
+def free_screens():
+    return models.ScreenSubscription.objects.filter(FREE_SCREEN)
+
+
+def free_screen_count():
+    free_count = (
+        free_screens()
+        .filter(streaming_account=OuterRef("pk"))
+        .order_by()
+        .values("streaming_account")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(free_count), 0)
+
+
+def refresh_available_screens(*account_ids):
+    """Recount the free screens of the given accounts into available_screens."""
+    models.StreamingServiceAccount.objects.filter(pk__in=account_ids).update(
+        available_screens=free_screen_count()
+    )
+
+
+def reconcile_available_screens(full=False, batch_size=RECONCILE_BATCH_SIZE, overlap=None):
+    """
+    Correct available_screens for the accounts whose screens changed since the last run.
+
+    Screens are read from a stored high-water mark on ScreenSubscription.updated_at, minus
+    overlap to catch transactions that committed late, and only accounts whose counter is
+    off are written, batch_size accounts per UPDATE.
+
+    A changed screen only points at the account it belongs to now. The save signals recount
+    the account a screen is moved away from, but a move done with QuerySet.update() leaves
+    that account behind for the incremental run, so bulk moves must be followed by full=True,
+    which checks every account.
+    """
+    overlap = RECONCILE_OVERLAP if overlap is None else overlap
+    checkpoint = models.ReconciliationCheckpoint.objects.filter(name="available_screens").first()
+
+    screens = models.ScreenSubscription.objects.all()
+    high_water_mark = screens.aggregate(mark=Max("updated_at"))["mark"]
+    if high_water_mark is None:
+        return {"checked": 0, "corrected": 0, "high_water_mark": None}
+    if full or checkpoint is None:
+        # Every account, including ones left without screens.
+        account_ids = models.StreamingServiceAccount.objects.order_by("pk").values_list(
+            "pk", flat=True
+        )
+    else:
+        account_ids = (
+            screens.filter(
+                updated_at__gt=checkpoint.high_water_mark - overlap,
+                updated_at__lte=high_water_mark,
+            )
+            .order_by("streaming_account")
+            .values_list("streaming_account", flat=True)
+            .distinct()
+        )
+    account_ids = account_ids.iterator(chunk_size=batch_size)
+    checked = corrected = 0
+    while batch := list(islice(account_ids, batch_size)):
+        checked += len(batch)
+        corrected += (
+            models.StreamingServiceAccount.objects.filter(pk__in=batch)
+            .exclude(available_screens=free_screen_count())
+            .update(available_screens=free_screen_count())
+        )
+
+    models.ReconciliationCheckpoint.objects.update_or_create(
+        name="available_screens", defaults={"high_water_mark": high_water_mark}
+    )
+    if corrected:
+        caching.invalidate_on_commit()
+    return {"checked": checked, "corrected": corrected, "high_water_mark": high_water_mark}
+
+
+def provision_screens(account):
+    """
+    Bring the active screens of account in line with its total_screens, in bulk.
+
+    Missing slots reuse retired free screens before new ones are created, and surplus free
+    screens are retired. Screens held by a user are never retired.
+    """
+    missing = account.total_screens - account.screen.filter(is_active=True).count()
+    if missing > 0:
+        retired = account.screen.filter(is_active=False, user__isnull=True)
+        revived = models.ScreenSubscription.objects.filter(
+            pk__in=list(retired.values_list("pk", flat=True)[:missing])
+        ).update(is_active=True, updated_at=timezone.now())
+        models.ScreenSubscription.objects.bulk_create(
+            models.ScreenSubscription(streaming_account=account) for _ in range(missing - revived)
+        )
+    elif missing < 0:
+        surplus = free_screens().filter(streaming_account=account).order_by("-pk")
+        models.ScreenSubscription.objects.filter(
+            pk__in=list(surplus.values_list("pk", flat=True)[:-missing])
+        ).update(is_active=False, updated_at=timezone.now())
+    refresh_available_screens(account.pk)
+
+
+def allocated_screen_ids(accounts=None, strategy=None):
+    """Ids of the first free screen of every account the strategy offers."""
+    strategy = strategy or BestFit()
+    return (
+        free_screens()
+        .filter(streaming_account__in=strategy.offered_accounts(accounts).values("pk"))
+        .order_by()
+        .values("streaming_account")
+        .annotate(first_screen=Min("pk"))
+        .values("first_screen")
+    )
+
+
+def claim_screen(user, strategy=None):
+    """
+    Assign one free screen to user, from the account the strategy picks next.
+
+    The account is picked through the partial account indexes of its service, then one of its
+    free screens is claimed. An account without a free screen left to claim, because other
+    claimers hold them or its counter is behind, is passed over for the next pick.
+    Returns None when there is no free screen left.
+    """
+    strategy = strategy or BestFit()
+    accounts = models.StreamingServiceAccount.objects.all()
+    for _ in range(CLAIM_ATTEMPTS):
+        account = strategy.claim_account(accounts)
+        if account is None:
+            return None
+        screen = claim_account_screen(user, account)
+        if screen is not None:
+            return screen
+        accounts = accounts.exclude(pk=account.pk)
+    return None
+
+
+def claim_account_screen(user, account):
+    """
+    Assign one free screen of account to user, or return None when none can be claimed.
+
+    Concurrent claimers skip rows locked by each other instead of waiting on them. The claim
+    decrements available_screens as its last statement rather than recounting through the
+    save signals, so the account row is locked only until commit and the counter is never
+    written from a snapshot that misses another claim.
+    """
+    candidates = free_screens().filter(streaming_account=account).order_by("pk")
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            screen = candidates.select_for_update(skip_locked=True).first()
+            if screen is None:
+                return None
+            screen.user, screen.updated_at = user, timezone.now()
+            models.ScreenSubscription.objects.filter(pk=screen.pk).update(
+                user=user, updated_at=screen.updated_at
+            )
+            models.StreamingServiceAccount.objects.filter(pk=account.pk).update(
+                available_screens=F("available_screens") - 1
+            )
+            caching.invalidate_on_commit()
+        return screen
+
+    # SQLite has no row locks, so claim with a compare-and-swap on user IS NULL instead.
+    for screen_id in candidates.values_list("pk", flat=True)[:CLAIM_ATTEMPTS]:
+        with transaction.atomic():
+            claimed = (
+                free_screens().filter(pk=screen_id).update(user=user, updated_at=timezone.now())
+            )
+            if claimed:
+                # QuerySet.update() sends no signals to drop the cached availability.
+                refresh_available_screens(account.pk)
+                caching.invalidate_on_commit()
+        if claimed:
+            return models.ScreenSubscription.objects.get(pk=screen_id)
+    return None
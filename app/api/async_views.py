@@ -0,0 +1,195 @@
+"""
+Async views for the read-heavy endpoints, served by the ASGI worker.
+
+They answer GET with the same JSON as ScreenSubscriptionViewSet and ServiceViewSet, but read
+through the async ORM so the worker keeps serving other requests while one waits on the
+database or on a slow client. Other methods are handed to the sync views.
+"""
+
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import HttpResponse
+from django.urls import resolve
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.pagination import Cursor
+from rest_framework.request import Request
+
+from core import routers
+from core.authentication import CachedJWTAuthentication
+from core.renderers import ORJSONRenderer
+from . import caching
+from . import models
+from . import pagination
+from . import serializers
+from . import views
+
+renderer = ORJSONRenderer()
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+def read_only(view):
+    """
+    Serve GET and HEAD with view, and any other method with the sync view for the path.
+
+    Like views.ReplicaReadMixin, the view may read from a replica once it has checked what
+    is pinned to the primary.
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            match = resolve(request.path_info, urlconf="comparte.urls")
+            return await sync_to_async(match.func)(request, *match.args, **match.kwargs)
+        token = routers.read_replica.set(False)
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            return json_response(detail, status=exc.status_code)
+        finally:
+            routers.read_replica.reset(token)
+
+    return wrapper
+
+
+class KeysetPage:
+    """
+    Keyset pagination with the link format of the DRF cursor paginators.
+
+    The cursor position holds the values of every ordering field of the boundary row, so ties
+    on the first field need no offset. Tokens are only meant for these views.
+    """
+
+    def __init__(self, request, pagination_class):
+        self.paginator = pagination_class()
+        self.request = Request(request)
+        self.paginator.base_url = request.build_absolute_uri()
+        self.page_size = self.paginator.get_page_size(self.request)
+        self.ordering = self.paginator.ordering
+        if isinstance(self.ordering, str):
+            self.ordering = (self.ordering,)
+        self.cursor = self.paginator.decode_cursor(self.request)
+
+    def after(self, values, lookup):
+        """Rows past values in ordering, "gt" for the next page and "lt" for the previous."""
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            equal = {name: value for name, value in zip(self.ordering[:index], values)}
+            condition |= Q(**equal, **{f"{field}__{lookup}": values[index]})
+        return condition
+
+    def position(self):
+        try:
+            values = json.loads(self.cursor.position)
+        except (TypeError, ValueError):
+            values = None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.paginator.invalid_cursor_message)
+        return values
+
+    async def rows(self, queryset):
+        reverse = self.cursor is not None and self.cursor.reverse
+        if self.cursor is not None:
+            queryset = queryset.filter(self.after(self.position(), "lt" if reverse else "gt"))
+        order = [f"-{field}" if reverse else field for field in self.ordering]
+        rows = [row async for row in queryset.order_by(*order)[: self.page_size + 1]]
+
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, self.cursor is not None
+        self.next = self.link(rows[-1:], reverse=False) if has_next else None
+        self.previous = self.link(rows[:1], reverse=True) if has_previous else None
+        return rows
+
+    def link(self, rows, reverse):
+        if not rows:
+            return None
+        position = json.dumps([position_value(rows[0][field]) for field in self.ordering])
+        return self.paginator.encode_cursor(Cursor(offset=0, reverse=reverse, position=position))
+
+    def response_data(self, results):
+        return {"next": self.next, "previous": self.previous, "results": results}
+
+
+def position_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+async def paginated(request, queryset, serializer_class, pagination_class):
+    fast = serializers.values_serializer(serializer_class)
+    page = KeysetPage(request, pagination_class)
+    rows = await page.rows(fast.values(queryset, *page.ordering))
+    return page.response_data(fast.to_representation(rows))
+
+
+@read_only
+async def screens(request):
+    routers.read_replica.set(not await routers.apinned([caching.VERSION_KEY]))
+
+    paginator = pagination.ScreenAvailabilityPagination
+
+    async def compute():
+        queryset = await sync_to_async(views.available_screens)(
+            models.ScreenSubscription.objects.all(), request.GET
+        )
+        data = await paginated(
+            request, queryset, serializers.ScreenSubscriptionSerializer, paginator
+        )
+        return paginator.cached_page(data)
+
+    # Kept apart from the sync listing, whose cursors are encoded differently.
+    params = f"async:{views.availability_params_key(request.GET)}"
+    data = await caching.acached_availability(params, compute)
+    return json_response(paginator.linked_page(request, data))
+
+
+@read_only
+async def my_screens(request):
+    user = None
+    result = await sync_to_async(CachedJWTAuthentication().authenticate)(Request(request))
+    if result is not None:
+        user = result[0]
+
+    screens = models.ScreenSubscription.objects.none()
+    if user is not None:
+        routers.read_replica.set(not await routers.apinned([routers.user_key(user)]))
+        screens = models.ScreenSubscription.objects.filter(user=user)
+    return json_response(
+        await paginated(
+            request,
+            screens,
+            serializers.MyScreenSubscriptionSerializer,
+            pagination.MyScreensPagination,
+        )
+    )
+
+
+@read_only
+async def services(request):
+    # Same tag as ServiceViewSet gives its JSON responses, read before the catalog.
+    etag = f'"{await caching.aversion(caching.CATALOG_VERSION_KEY)}-{renderer.format}"'
+    if_none_match = request.headers.get("If-None-Match")
+    etags = parse_etags(if_none_match) if if_none_match else []
+    if etags == ["*"] or etag in etags:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        routers.read_replica.set(not await routers.apinned([caching.CATALOG_VERSION_KEY]))
+        fast = serializers.values_serializer(serializers.ServiceSerializer)
+        rows = [row async for row in fast.values(models.Service.objects.order_by("pk"))]
+        response = json_response(fast.to_representation(rows))
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=views.ServiceViewSet.cache_max_age)
+    return response
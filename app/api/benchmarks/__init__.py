@@ -0,0 +1,88 @@
+"""
+Benchmarks for the api app.
+
+Every module runs from the app directory against a throwaway test database built from the
+active settings, for example:
+
+    python -m api.benchmarks.allocation --screens 10000 100000 1000000
+
+Results are printed as JSON so runs can be compared across commits.
+"""
+
+import io
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "comparte.settings.development")
+    django.setup()
+
+    from django.test.utils import setup_test_environment
+
+    # Runs with DEBUG off so the debug toolbar and query log stay out of the timings.
+    setup_test_environment(debug=False)
+
+
+@contextmanager
+def benchmark_database():
+    """Create a test database for the default connection and destroy it afterwards."""
+    from django.db import connection
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_screens(total, screens_per_account=4, services=10, users=None, seed=0):
+    """
+    Seed users, services, accounts and total screens with the seed_data command.
+
+    Returns the services, most popular first.
+    """
+    from django.core.management import call_command
+
+    from api import models
+
+    call_command(
+        "seed_data",
+        users=users or max(total // 10, 2),
+        services=services,
+        screens=total,
+        screens_per_account=screens_per_account,
+        seed=seed,
+        stdout=io.StringIO(),
+    )
+    return list(models.Service.objects.order_by("pk"))
+
+
+def summarize(samples):
+    """Latency percentiles in milliseconds for samples taken in seconds."""
+    samples = sorted(sample * 1000 for sample in samples)
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(cuts[49], 4),
+        "p95_ms": round(cuts[94], 4),
+        "p99_ms": round(cuts[98], 4),
+        "max_ms": round(samples[-1], 4),
+    }
+
+
+def measure(func, repeat, before=None):
+    samples = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
@@ -0,0 +1,45 @@
+"""
+Pick and claim latency of each allocation strategy.
+
+A claim picks the account like pick does, then takes one of its free screens for a user.
+
+    python -m api.benchmarks.allocation --screens 10000 100000 1000000
+"""
+
+import argparse
+import json
+
+from . import benchmark_database, measure, seed_screens, setup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--screens", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    setup()
+    from api import allocation
+    from core.models import User
+
+    results = []
+    for total in args.screens:
+        with benchmark_database():
+            popular_service = seed_screens(total)[0]
+            user = User.objects.first()
+            for name, strategy_class in allocation.STRATEGIES.items():
+                strategy = strategy_class(popular_service)
+                for operation, func in (
+                    ("pick", strategy.pick),
+                    ("claim", lambda: allocation.claim_screen(user, strategy)),
+                ):
+                    timings = measure(func, args.repeat)
+                    results.append(
+                        {"screens": total, "strategy": name, "operation": operation, **timings}
+                    )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
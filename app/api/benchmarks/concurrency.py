@@ -0,0 +1,174 @@
+"""
+Throughput and latency of the read endpoints under concurrent clients, WSGI against ASGI.
+
+    python -m api.benchmarks.concurrency --screens 100000 --concurrency 10 100 --duration 10
+
+Both servers run as one gunicorn worker over the same seeded SQLite file: the threaded sync
+worker used in production, and the uvicorn worker serving the async views.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import seed_screens, summarize
+
+SERVERS = {
+    "wsgi": ["comparte.wsgi:application", "--threads", "10"],
+    "asgi": ["comparte.asgi:application", "-k", "uvicorn_worker.UvicornWorker"],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(total):
+    """Migrate and seed the benchmark database, returning the paths and headers to request."""
+    import django
+
+    django.setup()
+    from django.core.management import call_command
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from core.models import User
+
+    call_command("migrate", verbosity=0)
+    services = seed_screens(total)
+    subscriber = User.objects.filter(screensubscription__isnull=False).first()
+    auth = {"Authorization": f"JWT {AccessToken.for_user(subscriber)}"}
+    return [
+        ("screens", "/api/screens/", {}),
+        ("screens_by_service", f"/api/screens/?service={services[0].pk}", {}),
+        ("my_screens", "/api/screens/my_screens/", auth),
+        ("services", "/api/services/", {}),
+    ]
+
+
+def start_server(mode, port, env):
+    command = [sys.executable, "-m", "gunicorn", *SERVERS[mode]]
+    command += ["--workers", "1", "--bind", f"127.0.0.1:{port}", "--timeout", "30"]
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"{mode} server exited:\n{server.stderr.read().decode()}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = dict(line.split(":", 1) for line in lines[1:] if ":" in line)
+    headers = {name.strip().lower(): value.strip() for name, value in headers.items()}
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+        return status, headers.get("connection", "").lower() != "close"
+    await reader.read()
+    return status, False
+
+
+async def client(port, request, deadline, samples, errors):
+    reader = writer = None
+    while time.monotonic() < deadline:
+        if writer is None:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        start = time.perf_counter()
+        try:
+            writer.write(request)
+            status, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError):
+            errors.append("connection")
+            writer.close()
+            writer = None
+            continue
+        samples.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(status)
+        if not keep_alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+def build_request(path, headers):
+    lines = [f"GET {path} HTTP/1.1", "Host: 127.0.0.1", "Accept: application/json"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+async def warm_up(port, request, count=5):
+    """Fill the caches and open the server's database connection before timing."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for _ in range(count):
+            writer.write(request)
+            await read_response(reader)
+    finally:
+        writer.close()
+
+
+async def load(port, request, concurrency, duration):
+    samples, errors = [], []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(
+        *(client(port, request, deadline, samples, errors) for _ in range(concurrency))
+    )
+    return {
+        "requests_per_second": round(len(samples) / duration, 1),
+        "errors": len(errors),
+        **summarize(samples),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--screens", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--modes", nargs="+", choices=sorted(SERVERS), default=["wsgi", "asgi"])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DJANGO_SETTINGS_MODULE"] = "comparte.settings.benchmark"
+        os.environ["DJANGO_BENCHMARK_DB"] = os.path.join(directory, "db.sqlite3")
+        endpoints = seed(args.screens)
+
+        results = []
+        for mode in args.modes:
+            port = free_port()
+            server = start_server(mode, port, dict(os.environ))
+            try:
+                for name, path, headers in endpoints:
+                    request = build_request(path, headers)
+                    asyncio.run(warm_up(port, request))
+                    for concurrency in args.concurrency:
+                        result = asyncio.run(load(port, request, concurrency, args.duration))
+                        results.append(
+                            {"mode": mode, "endpoint": name, "concurrency": concurrency, **result}
+                        )
+            finally:
+                server.terminate()
+                server.wait()
+
+    print(json.dumps({"screens": args.screens, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
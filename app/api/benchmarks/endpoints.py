@@ -0,0 +1,104 @@
+"""
+Latency and SQL query counts of the api endpoints over seeded datasets.
+
+    python -m api.benchmarks.endpoints --screens 1000 100000 1000000 --output bench.json
+"""
+
+import argparse
+import json
+import subprocess
+from datetime import datetime, timezone
+
+from . import benchmark_database, measure, seed_screens, setup
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def endpoints():
+    """(name, url, user, clear cache before each request) for every measured endpoint."""
+    from core.models import User
+    from api import models
+
+    subscriber = User.objects.filter(screensubscription__isnull=False).first()
+    owner = User.objects.filter(streamingserviceaccount__isnull=False).first()
+    service = models.Service.objects.order_by("pk").first()
+    return [
+        ("screens", "/api/screens/", None, False),
+        ("screens_uncached", "/api/screens/", None, True),
+        ("screens_by_service", f"/api/screens/?service={service.pk}", None, True),
+        ("my_screens", "/api/screens/my_screens/", subscriber, False),
+        ("accounts", "/api/accounts/", owner, False),
+        ("services", "/api/services/", None, False),
+    ]
+
+
+def run_endpoint(url, user, uncached, repeat):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user=user)
+    before = cache.clear if uncached else None
+
+    # Warm the cache and the connection, then count the queries of one request as timed.
+    client.get(url)
+    if before:
+        before()
+    with CaptureQueriesContext(connection) as queries:
+        status_code = client.get(url).status_code
+    query_count = len(queries)
+
+    timings = measure(lambda: client.get(url), repeat, before)
+    return {"status": status_code, "queries": query_count, **timings}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--screens", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--users", type=int, help="Users to seed, a tenth of screens by default.")
+    parser.add_argument("--services", type=int, default=10)
+    parser.add_argument("--screens-per-account", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args(argv)
+
+    setup()
+
+    report = {
+        "revision": git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "repeat": args.repeat,
+        "results": [],
+    }
+    for total in args.screens:
+        with benchmark_database():
+            seed_screens(
+                total,
+                screens_per_account=args.screens_per_account,
+                services=args.services,
+                users=args.users,
+            )
+            for name, url, user, uncached in endpoints():
+                result = run_endpoint(url, user, uncached, args.repeat)
+                report["results"].append({"screens": total, "endpoint": name, **result})
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
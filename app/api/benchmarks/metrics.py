@@ -0,0 +1,61 @@
+"""
+Overhead of the request metrics middleware.
+
+    python -m api.benchmarks.metrics --repeat 100000
+
+Times a request through MetricsMiddleware around a view that does nothing, against the same
+view called directly, and reports the difference per request.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+from . import setup
+
+
+def run(repeat, metrics_dir):
+    from django.http import HttpResponse
+    from django.test import RequestFactory, override_settings
+    from django.urls import resolve
+
+    from core import metrics
+    from core.middleware import MetricsMiddleware
+
+    response = HttpResponse()
+    request = RequestFactory().get("/api/services/")
+    request.resolver_match = resolve("/api/services/")
+
+    def bare(request):
+        return response
+
+    middleware = MetricsMiddleware(bare)
+    with override_settings(METRICS_DIR=metrics_dir):
+        metrics.registry = metrics.Registry()
+        timings = {}
+        for name, handler in (("bare", bare), ("middleware", middleware)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                handler(request)
+            timings[name] = (time.perf_counter() - start) / repeat
+    return {
+        "metrics_dir": bool(metrics_dir),
+        "repeat": repeat,
+        "overhead_us": round((timings["middleware"] - timings["bare"]) * 1_000_000, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=100_000)
+    args = parser.parse_args(argv)
+    setup()
+
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        results = [run(args.repeat, None), run(args.repeat, metrics_dir)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
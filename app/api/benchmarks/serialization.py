@@ -0,0 +1,77 @@
+"""
+List serialization through ModelSerializer instances against .values() rows.
+
+    python -m api.benchmarks.serialization --rows 10000
+
+Both paths include fetching the rows and rendering JSON, and must produce the same bytes.
+"""
+
+import argparse
+import json
+
+from . import benchmark_database, measure, seed_screens, setup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    setup()
+    from rest_framework.renderers import JSONRenderer
+
+    from api import models, serializers
+
+    renderer = JSONRenderer()
+    cases = [
+        (
+            "screens",
+            serializers.ScreenSubscriptionSerializer,
+            models.ScreenSubscription.objects.order_by("pk"),
+        ),
+        (
+            "my_screens",
+            serializers.MyScreenSubscriptionSerializer,
+            models.ScreenSubscription.objects.select_related("streaming_account__service").order_by(
+                "pk"
+            ),
+        ),
+        (
+            "accounts",
+            serializers.StreamingServiceAccountSerializer,
+            models.StreamingServiceAccount.objects.order_by("pk"),
+        ),
+    ]
+
+    results = []
+    for rows in args.rows:
+        with benchmark_database():
+            seed_screens(rows * 4)
+            for name, serializer_class, queryset in cases:
+                queryset = queryset[:rows]
+                fast = serializers.values_serializer(serializer_class)
+
+                def model_serializer():
+                    return renderer.render(serializer_class(queryset.all(), many=True).data)
+
+                def values_serializer():
+                    return renderer.render(fast.to_representation(fast.values(queryset.all())))
+
+                assert model_serializer() == values_serializer(), name
+                baseline = measure(model_serializer, args.repeat)
+                optimized = measure(values_serializer, args.repeat)
+                results.append(
+                    {
+                        "rows": rows,
+                        "serializer": name,
+                        "model_serializer": baseline,
+                        "values_serializer": optimized,
+                        "speedup": round(baseline["mean_ms"] / optimized["mean_ms"], 2),
+                    }
+                )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
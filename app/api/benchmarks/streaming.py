@@ -0,0 +1,60 @@
+"""
+Peak memory of the superuser account listing, buffered against streamed.
+
+    python -m api.benchmarks.streaming --accounts 10000 100000
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from unittest import mock
+
+from . import benchmark_database, seed_screens, setup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args(argv)
+
+    setup()
+    from rest_framework.test import APIClient
+
+    from api import views
+    from core.models import User
+
+    results = []
+    for accounts in args.accounts:
+        with benchmark_database():
+            seed_screens(accounts * 4)
+            client = APIClient()
+            client.force_authenticate(User.objects.create(username="admin", is_superuser=True))
+            for mode in ("buffered", "streamed"):
+                tracemalloc.start()
+                start = time.perf_counter()
+                if mode == "buffered":
+                    # The listing as it is served to owners, rendered in one piece.
+                    with mock.patch.object(
+                        views.StreamingServiceAccountViewSet, "list", views.ValuesListMixin.list
+                    ):
+                        body = len(client.get("/api/accounts/").content)
+                else:
+                    response = client.get("/api/accounts/")
+                    body = sum(len(chunk) for chunk in response.streaming_content)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results.append(
+                    {
+                        "accounts": accounts,
+                        "mode": mode,
+                        "bytes": body,
+                        "seconds": round(time.perf_counter() - start, 3),
+                        "peak_mb": round(peak / 1024 / 1024, 2),
+                    }
+                )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
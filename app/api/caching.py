@@ -0,0 +1,118 @@
+"""
+Screen availability cache and the service catalog version
+"""
+
+import asyncio
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core import routers
+
+VERSION_KEY = "screens:availability:version"
+CATALOG_VERSION_KEY = "services:catalog:version"
+TIMEOUT = 60 * 5
+
+# A recompute holding the lock longer than this is assumed dead.
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+WAIT_ATTEMPTS = 20
+
+
+def version(key=VERSION_KEY):
+    current = cache.get(key)
+    if current is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        current = cache.get(key)
+    return current
+
+
+async def aversion(key=VERSION_KEY):
+    current = await cache.aget(key)
+    if current is None:
+        await cache.aadd(key, uuid.uuid4().hex, None)
+        current = await cache.aget(key)
+    return current
+
+
+def invalidate(key=VERSION_KEY):
+    cache.set(key, uuid.uuid4().hex, None)
+    # Refill from the primary until the replicas have the change too.
+    routers.pin(key)
+
+
+def invalidate_on_commit(key=VERSION_KEY):
+    # Invalidate again on commit so a listing recomputed mid-transaction is not kept.
+    invalidate(key)
+    transaction.on_commit(lambda: invalidate(key))
+
+
+def params_key(query_params, names):
+    """Key part for the given query params only, so unknown params share the cached entry."""
+    return "&".join(
+        f"{name}={query_params[name]}" for name in sorted(names) if name in query_params
+    )
+
+
+def cached_availability(params, compute):
+    """
+    Return the availability listing for params, calling compute at most once per version.
+
+    Only the worker that wins the lock recomputes after an invalidation; the others keep
+    serving the previous listing, or wait for the new one when there is none. The lock needs
+    a backend whose add is atomic across workers, such as the Redis cache of production.
+    """
+    key = f"screens:availability:{params}"
+    current = version()
+    entry = cache.get(key)
+    if entry is not None and entry[0] == current:
+        return entry[1]
+
+    lock_key = f"{key}:lock:{current}"
+    if cache.add(lock_key, True, LOCK_TIMEOUT):
+        try:
+            data = compute()
+            cache.set(key, (current, data), TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return data
+
+    if entry is not None:
+        return entry[1]
+
+    for _ in range(WAIT_ATTEMPTS):
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == current:
+            return entry[1]
+    return compute()
+
+
+async def acached_availability(params, compute):
+    """cached_availability for async views, where compute is a coroutine function."""
+    key = f"screens:availability:{params}"
+    current = await aversion()
+    entry = await cache.aget(key)
+    if entry is not None and entry[0] == current:
+        return entry[1]
+
+    lock_key = f"{key}:lock:{current}"
+    if await cache.aadd(lock_key, True, LOCK_TIMEOUT):
+        try:
+            data = await compute()
+            await cache.aset(key, (current, data), TIMEOUT)
+        finally:
+            await cache.adelete(lock_key)
+        return data
+
+    if entry is not None:
+        return entry[1]
+
+    for _ in range(WAIT_ATTEMPTS):
+        await asyncio.sleep(WAIT_INTERVAL)
+        entry = await cache.aget(key)
+        if entry is not None and entry[0] == current:
+            return entry[1]
+    return await compute()
@@ -0,0 +1,17 @@
+"""
+API Filters
+"""
+
+import django_filters
+
+from . import models
+
+
+class ScreenAvailabilityFilter(django_filters.FilterSet):
+    """Narrows the accounts screens are allocated from."""
+
+    service = django_filters.ModelChoiceFilter(queryset=models.Service.objects.all())
+
+    class Meta:
+        model = models.StreamingServiceAccount
+        fields = ["service"]
@@ -0,0 +1,197 @@
+"""
+Streaming account import
+"""
+
+import codecs
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import connection, transaction
+from rest_framework import serializers as drf_serializers
+
+from . import caching
+from . import models
+from . import serializers
+
+CHUNK_SIZE = 500
+
+
+def read_csv(lines, encoding="utf-8-sig"):
+    """Yield (row number, row) for a CSV upload with a header line."""
+    reader = csv.DictReader(codecs.iterdecode(lines, encoding))
+    for row in reader:
+        yield reader.line_num - 1, row
+
+
+def read_json_lines(lines, encoding="utf-8"):
+    """Yield (row number, row) for a JSON Lines upload; rows that are not objects are None."""
+    number = 0
+    for line in codecs.iterdecode(lines, encoding):
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def read_upload(upload):
+    if upload.name.lower().endswith(".csv") or upload.content_type == "text/csv":
+        return read_csv(upload)
+    return read_json_lines(upload)
+
+
+def copy_value(value):
+    if value is None:
+        return r"\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_objects(model, objs, with_pk=False):
+    """Insert objs with PostgreSQL COPY ... FROM STDIN."""
+    fields = [field for field in model._meta.concrete_fields if with_pk or not field.primary_key]
+    buffer = io.StringIO()
+    for obj in objs:
+        values = (
+            field.get_db_prep_save(field.pre_save(obj, add=True), connection) for field in fields
+        )
+        buffer.write("\t".join(copy_value(value) for value in values) + "\n")
+    buffer.seek(0)
+
+    quote_name = connection.ops.quote_name
+    columns = ", ".join(quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {quote_name(model._meta.db_table)} ({columns}) FROM STDIN", buffer
+        )
+
+
+def readable_rows(rows, errors):
+    """
+    Yield rows until the upload cannot be decoded or parsed any further.
+
+    The readers are lazy, so these errors surface while the rows are iterated; the first one
+    is reported against the row after the last one read, and ends the upload.
+    """
+    rows = iter(rows)
+    number = 0
+    while True:
+        try:
+            number, row = next(rows)
+        except StopIteration:
+            return
+        except (UnicodeDecodeError, csv.Error) as error:
+            message = f"Could not be read: {error}"
+            errors.append({"row": number + 1, "errors": {"non_field_errors": [message]}})
+            return
+        yield number, row
+
+
+class AccountImportSerializer(serializers.StreamingServiceAccountSerializer):
+    """Row validation without a per-row service lookup; services are checked per chunk."""
+
+    service = drf_serializers.IntegerField()
+
+
+class AccountImporter:
+    """
+    Imports StreamingServiceAccount rows for owner, with their screen slots.
+
+    Rows are validated and written chunk by chunk, so an upload is never held in memory.
+    """
+
+    def __init__(self, owner, chunk_size=CHUNK_SIZE):
+        self.owner = owner
+        self.chunk_size = chunk_size
+
+    def run(self, rows):
+        created = 0
+        errors = []
+        rows = readable_rows(rows, errors)
+        while chunk := list(islice(rows, self.chunk_size)):
+            accounts = self.validate(chunk, errors)
+            if accounts:
+                with transaction.atomic():
+                    self.write(accounts)
+                    caching.invalidate_on_commit()
+                created += len(accounts)
+        return {"created": created, "errors": errors}
+
+    def validate(self, chunk, errors):
+        valid = []
+        for number, row in chunk:
+            if row is None:
+                errors.append({"row": number, "errors": {"non_field_errors": ["Invalid row."]}})
+                continue
+            serializer = AccountImportSerializer(data=row)
+            if serializer.is_valid():
+                valid.append((number, serializer.validated_data))
+            else:
+                errors.append({"row": number, "errors": serializer.errors})
+
+        service_ids = {data["service"] for _, data in valid}
+        known_services = set(
+            models.Service.objects.filter(pk__in=service_ids).values_list("pk", flat=True)
+        )
+        does_not_exist = drf_serializers.PrimaryKeyRelatedField.default_error_messages[
+            "does_not_exist"
+        ]
+
+        accounts = []
+        for number, data in valid:
+            service_id = data.pop("service")
+            if service_id not in known_services:
+                message = does_not_exist.format(pk_value=service_id)
+                errors.append({"row": number, "errors": {"service": [message]}})
+                continue
+            accounts.append(
+                models.StreamingServiceAccount(
+                    owner=self.owner,
+                    service_id=service_id,
+                    available_screens=data["total_screens"],
+                    **data,
+                )
+            )
+        return accounts
+
+    def write(self, accounts):
+        if connection.vendor == "postgresql":
+            self.copy(accounts)
+            return
+
+        models.StreamingServiceAccount.objects.bulk_create(accounts)
+        models.ScreenSubscription.objects.bulk_create(
+            models.ScreenSubscription(streaming_account=account)
+            for account in accounts
+            for _ in range(account.total_screens)
+        )
+
+    def copy(self, accounts):
+        table = models.StreamingServiceAccount._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [table, len(accounts)],
+            )
+            for account, (pk,) in zip(accounts, cursor.fetchall()):
+                account.pk = pk
+
+        copy_objects(models.StreamingServiceAccount, accounts, with_pk=True)
+        copy_objects(
+            models.ScreenSubscription,
+            (
+                models.ScreenSubscription(streaming_account=account)
+                for account in accounts
+                for _ in range(account.total_screens)
+            ),
+        )
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def recount_available_screens(apps, schema_editor):
+    StreamingServiceAccount = apps.get_model('api', 'StreamingServiceAccount')
+    ScreenSubscription = apps.get_model('api', 'ScreenSubscription')
+    free_count = (
+        ScreenSubscription.objects.filter(
+            streaming_account=OuterRef('pk'), is_active=True, user__isnull=True
+        )
+        .order_by()
+        .values('streaming_account')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    StreamingServiceAccount.objects.update(available_screens=Coalesce(Subquery(free_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_alter_screensubscription_payment_status_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='streamingserviceaccount',
+            name='available_screens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='streamingserviceaccount',
+            index=models.Index(fields=['available_screens'], name='account_available_idx'),
+        ),
+        migrations.RunPython(recount_available_screens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_streamingserviceaccount_available_screens_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='allocation_strategy',
+            field=models.CharField(choices=[('best_fit', 'Best Fit'), ('round_robin', 'Round Robin'), ('cheapest', 'Cheapest'), ('spread', 'Spread Evenly')], default='best_fit', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='streamingserviceaccount',
+            index=models.Index(condition=models.Q(('available_screens__gt', 0)), fields=['service', 'available_screens'], name='account_service_avail_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='streamingserviceaccount',
+            index=models.Index(condition=models.Q(('available_screens__gt', 0)), fields=['service', 'price_per_screen'], name='account_service_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='streamingserviceaccount',
+            index=models.Index(condition=models.Q(('available_screens__gt', 0)), fields=['service', 'id'], name='account_service_id_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_service_allocation_strategy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='screensubscription',
+            index=models.Index(condition=models.Q(('is_active', True), ('user__isnull', True)), fields=['streaming_account'], name='screen_free_account_idx'),
+        ),
+    ]
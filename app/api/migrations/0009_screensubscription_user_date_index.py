@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_screensubscription_free_account_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='screensubscription',
+            index=models.Index(fields=['user', 'subscription_date', 'id'], name='screen_user_date_idx'),
+        ),
+    ]
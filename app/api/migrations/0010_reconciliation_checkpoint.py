@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_screensubscription_user_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('high_water_mark', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='screensubscription',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
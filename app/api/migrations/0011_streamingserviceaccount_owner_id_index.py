@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_reconciliation_checkpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='streamingserviceaccount',
+            index=models.Index(fields=['owner', 'id'], name='account_owner_id_idx'),
+        ),
+    ]
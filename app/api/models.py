@@ -8,7 +8,17 @@ from django.conf import settings
 
 class Service(models.Model):
 
+    ALLOCATION_STRATEGY_CHOICES = [
+        ("best_fit", "Best Fit"),
+        ("round_robin", "Round Robin"),
+        ("cheapest", "Cheapest"),
+        ("spread", "Spread Evenly"),
+    ]
+
     name = models.CharField(max_length=255)
+    allocation_strategy = models.CharField(
+        max_length=20, choices=ALLOCATION_STRATEGY_CHOICES, default="best_fit"
+    )
 
     def __str__(self):
         return self.name
@@ -32,9 +42,31 @@ class StreamingServiceAccount(models.Model):
     password = models.CharField(max_length=255)
     price_per_screen = models.DecimalField(max_digits=5, decimal_places=2)
     total_screens = models.PositiveIntegerField()
-    available_screens = models.PositiveIntegerField()
+    available_screens = models.PositiveIntegerField(default=0)
     verfied = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["available_screens"], name="account_available_idx"),
+            models.Index(
+                fields=["service", "available_screens"],
+                condition=models.Q(available_screens__gt=0),
+                name="account_service_avail_idx",
+            ),
+            models.Index(
+                fields=["service", "price_per_screen"],
+                condition=models.Q(available_screens__gt=0),
+                name="account_service_price_idx",
+            ),
+            models.Index(
+                fields=["service", "id"],
+                condition=models.Q(available_screens__gt=0),
+                name="account_service_id_idx",
+            ),
+            # Keyset pagination of an owner's accounts.
+            models.Index(fields=["owner", "id"], name="account_owner_id_idx"),
+        ]
+
 
 class ScreenSubscription(models.Model):
 
@@ -53,6 +85,27 @@ class ScreenSubscription(models.Model):
     is_active = models.BooleanField(default=True)
     subscription_date = models.DateTimeField(auto_now_add=True)
     payment_status = models.CharField(max_length=50, choices=PAYMENT_STATUS_CHOICES, default="N")
+    # Bulk updates must set this too, it drives the available_screens reconciliation.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["streaming_account"],
+                condition=models.Q(is_active=True, user__isnull=True),
+                name="screen_free_account_idx",
+            ),
+            models.Index(fields=["user", "subscription_date", "id"], name="screen_user_date_idx"),
+        ]
+
+
+class ReconciliationCheckpoint(models.Model):
+
+    name = models.CharField(max_length=100, unique=True)
+    high_water_mark = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
 
 
 # class Transaction(models.Model):
@@ -0,0 +1,68 @@
+"""
+API Pagination
+"""
+
+from urllib.parse import parse_qs, urlsplit
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class DefaultCursorPagination(CursorPagination):
+    """Keyset pagination on the primary key, so every page costs the same as the first."""
+
+    ordering = ("id",)
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+class ScreenAvailabilityPagination(DefaultCursorPagination):
+    """
+    Pages of the availability listing, which is cached for every client.
+
+    Cached pages keep only the cursors of their links, and the links are built again for each
+    request, so a client never gets the host or scheme of whoever filled the cache.
+    """
+
+    # One screen is offered per account, so the account is unique within the listing.
+    ordering = ("streaming_account",)
+
+    @classmethod
+    def cached_page(cls, data):
+        """The paginated response data with its links reduced to their cursors."""
+        return {
+            **data,
+            "next": cls.link_cursor(data["next"]),
+            "previous": cls.link_cursor(data["previous"]),
+        }
+
+    @classmethod
+    def linked_page(cls, request, data):
+        """A cached page with its links built for request."""
+        base_url = request.build_absolute_uri()
+        return {
+            **data,
+            "next": cls.cursor_link(base_url, data["next"]),
+            "previous": cls.cursor_link(base_url, data["previous"]),
+        }
+
+    @classmethod
+    def link_cursor(cls, link):
+        if link is None:
+            return None
+        return parse_qs(urlsplit(link).query)[cls.cursor_query_param][0]
+
+    @classmethod
+    def cursor_link(cls, base_url, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(base_url, cls.cursor_query_param, cursor)
+
+
+class MyScreensPagination(CursorPagination):
+
+    ordering = ("subscription_date", "id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
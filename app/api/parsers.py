@@ -0,0 +1,30 @@
+"""
+API Parsers
+"""
+
+from rest_framework.parsers import BaseParser
+
+from . import importers
+
+
+class CSVStreamParser(BaseParser):
+    """Parses a CSV body lazily into (row number, row) pairs."""
+
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return importers.read_csv(stream or ())
+
+
+class JSONLinesStreamParser(BaseParser):
+    """Parses a JSON Lines body lazily into (row number, row) pairs."""
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return importers.read_json_lines(stream or ())
+
+
+class JSONLStreamParser(JSONLinesStreamParser):
+
+    media_type = "application/jsonl"
@@ -2,7 +2,14 @@
 API Serializers
 """
 
+from functools import lru_cache
+
+from django.db import transaction
+from rest_framework import fields as drf_fields
+from rest_framework import relations
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from . import allocation
 from . import models
 
 
@@ -17,7 +24,7 @@ class ServiceSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.Service
-        fields = ["id", "name"]
+        fields = ["id", "name", "allocation_strategy"]
 
 
 class StreamingServiceAccountSerializer(serializers.ModelSerializer):
@@ -33,10 +40,30 @@ class StreamingServiceAccountSerializer(serializers.ModelSerializer):
             "total_screens",
             "available_screens",
         ]
+        read_only_fields = ["available_screens"]
 
+    @transaction.atomic
     def create(self, validated_data):
         user = self.context["request"].user
-        return models.StreamingServiceAccount.objects.create(owner=user, **validated_data)
+        account = models.StreamingServiceAccount.objects.create(
+            owner=user, available_screens=validated_data["total_screens"], **validated_data
+        )
+        models.ScreenSubscription.objects.bulk_create(
+            models.ScreenSubscription(streaming_account=account)
+            for _ in range(account.total_screens)
+        )
+        return account
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        resized = validated_data.get("total_screens", instance.total_screens) != (
+            instance.total_screens
+        )
+        account = super().update(instance, validated_data)
+        if resized:
+            allocation.provision_screens(account)
+            account.refresh_from_db(fields=["available_screens"])
+        return account
 
 
 class ScreenSubscriptionSerializer(serializers.ModelSerializer):
@@ -53,6 +80,104 @@ class ScreenSubscriptionSerializer(serializers.ModelSerializer):
         ]
 
 
+class MyScreenSubscriptionSerializer(ScreenSubscriptionSerializer):
+
+    service_name = serializers.CharField(source="streaming_account.service.name", read_only=True)
+    price_per_screen = serializers.DecimalField(
+        source="streaming_account.price_per_screen",
+        max_digits=5,
+        decimal_places=2,
+        read_only=True,
+    )
+
+    class Meta(ScreenSubscriptionSerializer.Meta):
+        fields = ScreenSubscriptionSerializer.Meta.fields + ["service_name", "price_per_screen"]
+
+
+class ValuesSerializer:
+    """
+    Read-only list representation built from .values() rows instead of model instances.
+
+    Each readable field of the serializer is compiled once into the lookup it reads and the
+    function that formats it, so rows skip the per-field attribute machinery while producing
+    the same output. values_serializer() returns the cached one for a serializer class.
+    """
+
+    # Fields whose database value is already what they render.
+    PASSTHROUGH_FIELDS = (drf_fields.CharField, drf_fields.IntegerField, drf_fields.BooleanField)
+    # Fields that need the model instance or a request to render.
+    INSTANCE_FIELDS = (
+        serializers.BaseSerializer,
+        relations.RelatedField,
+        relations.ManyRelatedField,
+        drf_fields.SerializerMethodField,
+    )
+
+    def __init__(self, serializer_class):
+        self.columns = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if field.source == "*" or (
+                isinstance(field, self.INSTANCE_FIELDS)
+                and not isinstance(field, relations.PrimaryKeyRelatedField)
+            ):
+                raise TypeError(f"{name} cannot be read from .values() rows.")
+            self.columns.append((name, "__".join(field.source_attrs), field))
+        self.lookups = [lookup for _, lookup, _ in self.columns]
+
+    def formatter(self, field):
+        """The function that renders the field's value, None when the value renders as is."""
+        if isinstance(field, relations.PrimaryKeyRelatedField):
+            return field.pk_field.to_representation if field.pk_field is not None else None
+        if type(field) in self.PASSTHROUGH_FIELDS:
+            return None
+        if isinstance(field, drf_fields.DateTimeField):
+            return datetime_formatter(field)
+        return field.to_representation
+
+    def values(self, queryset, *extra):
+        """The queryset as .values() rows with every lookup the fields and extra need."""
+        return queryset.values(*dict.fromkeys([*self.lookups, *extra]))
+
+    def to_representation(self, rows):
+        # Formatters are built per call since datetimes render in the active timezone.
+        columns = [(name, lookup, self.formatter(field)) for name, lookup, field in self.columns]
+        data = []
+        for row in rows:
+            item = {}
+            for name, lookup, format in columns:
+                value = row[lookup]
+                item[name] = value if format is None or value is None else format(value)
+            data.append(item)
+        return data
+
+
+def datetime_formatter(field):
+    """DateTimeField.to_representation with the timezone and format looked up once."""
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format is None or output_format.lower() != drf_fields.ISO_8601 or not field_timezone:
+        return field.to_representation
+
+    def format(value):
+        if isinstance(value, str) or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return format
+
+
+@lru_cache
+def values_serializer(serializer_class):
+    """The cached ValuesSerializer for serializer_class, or None when a field needs instances."""
+    try:
+        return ValuesSerializer(serializer_class)
+    except TypeError:
+        return None
+
+
 # class TransactionSerializer(serializers.ModelSerializer):
 
 #     class Meta:
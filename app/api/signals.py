@@ -0,0 +1,42 @@
+"""
+API Signals
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import allocation
+from . import caching
+from . import models
+
+
+@receiver(pre_save, sender=models.ScreenSubscription)
+def remember_previous_account(sender, instance, update_fields=None, **kwargs):
+    # A screen moved to another account frees a slot in the one it leaves.
+    instance._previous_account_id = None
+    if instance._state.adding:
+        return
+    if update_fields is not None and "streaming_account" not in update_fields:
+        return
+    instance._previous_account_id = (
+        sender.objects.filter(pk=instance.pk).values_list("streaming_account", flat=True).first()
+    )
+
+
+@receiver([post_save, post_delete], sender=models.ScreenSubscription)
+def update_available_screens(sender, instance, **kwargs):
+    account_ids = {instance.streaming_account_id, getattr(instance, "_previous_account_id", None)}
+    account_ids.discard(None)
+    allocation.refresh_available_screens(*account_ids)
+
+
+@receiver([post_save, post_delete], sender=models.ScreenSubscription)
+@receiver([post_save, post_delete], sender=models.StreamingServiceAccount)
+@receiver([post_save, post_delete], sender=models.Service)
+def invalidate_screen_availability(sender, **kwargs):
+    caching.invalidate_on_commit()
+
+
+@receiver([post_save, post_delete], sender=models.Service)
+def invalidate_service_catalog(sender, **kwargs):
+    caching.invalidate_on_commit(caching.CATALOG_VERSION_KEY)
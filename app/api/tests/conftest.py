@@ -1,7 +1,35 @@
+from contextlib import contextmanager
+
 import pytest
+from django.core.cache import cache
 from model_bakery import baker
 from rest_framework.test import APIClient
 from core.models import User
+from core.queries import count_queries
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Fixture to start every test with an empty cache."""
+    cache.clear()
+
+
+@pytest.fixture
+def query_budget():
+    """Fixture to fail the test when a block runs more SQL queries than its budget."""
+
+    @contextmanager
+    def check(max_queries):
+        with count_queries() as queries:
+            yield queries
+        if queries.count > max_queries:
+            statements = "\n".join(queries.statements)
+            pytest.fail(
+                f"{queries.count} queries run, budget is {max_queries}:\n{statements}",
+                pytrace=False,
+            )
+
+    return check
 
 
 @pytest.fixture
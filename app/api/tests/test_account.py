@@ -1,7 +1,18 @@
+import io
+import json
+from datetime import timedelta
+
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
 from rest_framework import status
 from model_bakery import baker
-from api.models import StreamingServiceAccount, Service
+from api import allocation, importers, views
+from api.models import ScreenSubscription, StreamingServiceAccount, Service
+from core import metrics
+from core.models import User
 
 
 @pytest.fixture
@@ -25,6 +36,29 @@ def create_streaming_service_account(create_user, create_service):
     )
 
 
+class FakeCopyCursor:
+    """Cursor that hands out next_ids for the sequence and records COPY statements."""
+
+    def __init__(self, next_ids):
+        self.next_ids = next_ids
+        self.copies = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return self.next_ids
+
+    def copy_expert(self, sql, buffer):
+        self.copies.append((sql, buffer.read().splitlines()))
+
+
 @pytest.mark.django_db
 class TestStreamingServiceAccount:
 
@@ -39,8 +73,8 @@ class TestStreamingServiceAccount:
     ):
         response = authenticated_user.get("/api/accounts/")
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
-        assert response.data[0]["username"] == create_streaming_service_account.username
+        assert len(response.data["results"]) == 1
+        assert response.data["results"][0]["username"] == create_streaming_service_account.username
 
     def test_retrieve_streaming_account_authenticated_return_200(
         self, authenticated_user, create_streaming_service_account
@@ -84,6 +118,163 @@ class TestStreamingServiceAccount:
         assert response.status_code == status.HTTP_201_CREATED
         assert StreamingServiceAccount.objects.filter(username="newuser").exists()
 
+    def test_create_streaming_account_provisions_screens(
+        self, authenticated_user, create_service, django_assert_max_num_queries
+    ):
+        account_data = {
+            "service": create_service.id,
+            "username": "newuser",
+            "password": "password123",
+            "price_per_screen": 9.99,
+            "total_screens": 5,
+        }
+        with django_assert_max_num_queries(5):
+            response = authenticated_user.post("/api/accounts/", account_data)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["available_screens"] == 5
+        assert (
+            ScreenSubscription.objects.filter(
+                streaming_account=response.data["id"], is_active=True, user__isnull=True
+            ).count()
+            == 5
+        )
+
+    def test_update_streaming_account_total_screens_resizes_screens(
+        self, authenticated_user, create_user, create_streaming_service_account
+    ):
+        account = create_streaming_service_account
+        baker.make(ScreenSubscription, streaming_account=account, user=create_user)
+        baker.make(ScreenSubscription, streaming_account=account, user=None, _quantity=3)
+
+        response = authenticated_user.patch(f"/api/accounts/{account.id}/", {"total_screens": 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["available_screens"] == 1
+        assert account.screen.filter(is_active=True).count() == 2
+
+        response = authenticated_user.patch(f"/api/accounts/{account.id}/", {"total_screens": 6})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["available_screens"] == 5
+        assert account.screen.filter(is_active=True).count() == 6
+        assert account.screen.count() == 6
+
+    def test_import_streaming_accounts_unauthenticated_return_401(self, api_client):
+        response = api_client.post("/api/accounts/import/", b"", content_type="text/csv")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_import_streaming_accounts_csv_return_201(
+        self, authenticated_user, create_user, create_service
+    ):
+        body = (
+            "service,username,password,price_per_screen,total_screens\n"
+            f"{create_service.id},first,secret,4.50,3\n"
+            f"{create_service.id},second,secret,not-a-price,2\n"
+            f"0,third,secret,4.50,2\n"
+            f"{create_service.id},fourth,secret,5.00,2\n"
+        )
+        response = authenticated_user.post(
+            "/api/accounts/import/", body.encode(), content_type="text/csv"
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["created"] == 2
+        assert [error["row"] for error in response.data["errors"]] == [2, 3]
+        assert "price_per_screen" in response.data["errors"][0]["errors"]
+        assert "service" in response.data["errors"][1]["errors"]
+        accounts = StreamingServiceAccount.objects.filter(owner=create_user)
+        assert sorted(accounts.values_list("username", flat=True)) == ["first", "fourth"]
+        assert ScreenSubscription.objects.filter(streaming_account__in=accounts).count() == 5
+
+    def test_import_streaming_accounts_json_lines_upload_return_201(
+        self, authenticated_user, create_service
+    ):
+        row = (
+            '{"service": %d, "username": "jsonl", "password": "secret", '
+            '"price_per_screen": 3.25, "total_screens": 4}' % create_service.id
+        )
+        upload = SimpleUploadedFile(
+            "accounts.jsonl", f"{row}\nnot json\n".encode(), "application/x-ndjson"
+        )
+        response = authenticated_user.post(
+            "/api/accounts/import/", {"file": upload}, format="multipart"
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["created"] == 1
+        assert response.data["errors"][0]["row"] == 2
+        account = StreamingServiceAccount.objects.get(username="jsonl")
+        assert account.available_screens == 4
+        assert account.screen.count() == 4
+
+    def test_import_streaming_accounts_not_utf8_reports_the_row(
+        self, authenticated_user, create_service
+    ):
+        body = (
+            "service,username,password,price_per_screen,total_screens\n"
+            f"{create_service.id},first,secret,4.50,3\n"
+        ).encode() + f"{create_service.id},caf\xe9,secret,4.50,3\n".encode("latin-1")
+        response = authenticated_user.post("/api/accounts/import/", body, content_type="text/csv")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["created"] == 1
+        (error,) = response.data["errors"]
+        assert error["row"] == 2
+        assert "utf-8" in error["errors"]["non_field_errors"][0]
+
+    def test_import_streaming_accounts_malformed_csv_return_400(
+        self, authenticated_user, create_service
+    ):
+        body = (
+            "service,username,password,price_per_screen,total_screens\n"
+            f"{create_service.id},{'x' * 200_000},secret,4.50,3\n"
+        )
+        response = authenticated_user.post(
+            "/api/accounts/import/", body.encode(), content_type="text/csv"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["created"] == 0
+        assert response.data["errors"][0]["row"] == 1
+
+    def test_import_streaming_accounts_copies_rows_on_postgresql(
+        self, create_user, create_service, monkeypatch
+    ):
+        cursor = FakeCopyCursor(next_ids=[(101,), (102,)])
+        monkeypatch.setattr(connection, "vendor", "postgresql")
+        monkeypatch.setattr(connection, "cursor", lambda: cursor)
+        accounts = [
+            StreamingServiceAccount(
+                owner=create_user,
+                service=create_service,
+                username=f"user\t{index}",
+                password="secret",
+                price_per_screen=4.5,
+                total_screens=index + 1,
+                available_screens=index + 1,
+            )
+            for index in range(2)
+        ]
+
+        importers.AccountImporter(owner=create_user).write(accounts)
+
+        (account_copy, account_rows), (screen_copy, screen_rows) = cursor.copies
+        assert account_copy.startswith('COPY "api_streamingserviceaccount" ("id", ')
+        assert [row.split("\t")[0] for row in account_rows] == ["101", "102"]
+        assert "user\\t0" in account_rows[0]
+        assert screen_copy.startswith('COPY "api_screensubscription" (')
+        assert len(screen_rows) == 3
+
+    def test_import_streaming_accounts_without_file_return_400(self, authenticated_user):
+        response = authenticated_user.post("/api/accounts/import/", {}, format="multipart")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_import_streaming_accounts_file_as_text_return_400(self, authenticated_user):
+        response = authenticated_user.post(
+            "/api/accounts/import/", {"file": "username,password"}, format="multipart"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "file" in response.data
+
     def test_update_streaming_account_unauthenticated_return_401(
         self, api_client, create_streaming_service_account
     ):
@@ -120,3 +311,160 @@ class TestStreamingServiceAccount:
         assert not StreamingServiceAccount.objects.filter(
             id=create_streaming_service_account.id
         ).exists()
+
+    def test_list_streaming_accounts_is_cursor_paginated(
+        self, authenticated_user, create_user, django_assert_num_queries
+    ):
+        accounts = baker.make(StreamingServiceAccount, owner=create_user, _quantity=5)
+        baker.make(StreamingServiceAccount)
+
+        first = authenticated_user.get("/api/accounts/", {"page_size": 2})
+        second = authenticated_user.get(first.data["next"])
+        with django_assert_num_queries(1) as queries:
+            last = authenticated_user.get(second.data["next"])
+
+        assert [account["id"] for account in first.data["results"]] == [
+            account.id for account in accounts[:2]
+        ]
+        assert [account["id"] for account in last.data["results"]] == [accounts[4].id]
+        assert last.data["next"] is None
+        # Deep pages seek on the key instead of counting and skipping rows.
+        assert " OFFSET " not in queries.captured_queries[-1]["sql"]
+
+    def test_list_streaming_accounts_superuser_is_paginated_by_default(self, api_client):
+        baker.make(StreamingServiceAccount, _quantity=3)
+        api_client.force_authenticate(user=baker.make(User, is_superuser=True))
+
+        response = api_client.get("/api/accounts/")
+
+        assert not response.streaming
+        assert set(response.data) == {"next", "previous", "results"}
+        assert len(response.data["results"]) == 3
+
+    def test_list_streaming_accounts_superuser_streams_every_account(
+        self, api_client, create_streaming_service_account, monkeypatch
+    ):
+        baker.make(StreamingServiceAccount, price_per_screen=4.5, _quantity=4)
+        monkeypatch.setattr(views.StreamingServiceAccountViewSet, "stream_chunk_size", 2)
+        api_client.force_authenticate(user=baker.make(User, is_superuser=True))
+
+        response = api_client.get("/api/accounts/", {"stream": 1})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"] == "application/json"
+        accounts = json.loads(b"".join(response.streaming_content))
+        assert [account["id"] for account in accounts] == list(
+            StreamingServiceAccount.objects.order_by("pk").values_list("pk", flat=True)
+        )
+        assert accounts[0] == {
+            "id": create_streaming_service_account.id,
+            "service": create_streaming_service_account.service_id,
+            "username": "testuser",
+            "password": "password123",
+            "price_per_screen": 9.99,
+            "total_screens": 4,
+            "available_screens": 2,
+        }
+
+    def test_list_streaming_accounts_superuser_stream_is_counted_as_it_is_read(
+        self, api_client, monkeypatch
+    ):
+        baker.make(StreamingServiceAccount, _quantity=4)
+        monkeypatch.setattr(views.StreamingServiceAccountViewSet, "stream_chunk_size", 2)
+        registry = metrics.Registry()
+        monkeypatch.setattr(metrics, "registry", registry)
+        api_client.force_authenticate(user=baker.make(User, is_superuser=True))
+
+        response = api_client.get("/api/accounts/", {"stream": 1})
+        queries_before_streaming = response.wsgi_request.queries.count
+        assert registry.histograms == {}
+        b"".join(response.streaming_content)
+
+        assert response.wsgi_request.queries.count > queries_before_streaming
+        labels = ("StreamingServiceAccountViewSet", "list", "GET", 200)
+        assert sum(registry.histograms[labels][:-1]) == 1
+
+    def test_list_streaming_accounts_superuser_empty_stream_is_valid_json(self, api_client):
+        api_client.force_authenticate(user=baker.make(User, is_superuser=True))
+
+        response = api_client.get("/api/accounts/", {"stream": 1})
+
+        assert json.loads(b"".join(response.streaming_content)) == []
+
+
+@pytest.mark.django_db
+class TestAvailableScreensReconciliation:
+
+    def test_reconcile_corrects_drifted_counters_only(self, create_user):
+        drifted, untouched = baker.make(StreamingServiceAccount, _quantity=2)
+        for account in (drifted, untouched):
+            baker.make(ScreenSubscription, streaming_account=account, user=None, _quantity=3)
+        taken = drifted.screen.values_list("pk", flat=True)[:2]
+        ScreenSubscription.objects.filter(pk__in=list(taken)).update(
+            user=create_user, updated_at=timezone.now()
+        )
+
+        result = allocation.reconcile_available_screens()
+
+        assert result["corrected"] == 1
+        drifted.refresh_from_db()
+        untouched.refresh_from_db()
+        assert drifted.available_screens == 1
+        assert untouched.available_screens == 3
+
+    def test_reconcile_starts_from_high_water_mark(self, create_user):
+        account = baker.make(StreamingServiceAccount)
+        baker.make(ScreenSubscription, streaming_account=account, user=None, _quantity=2)
+        allocation.reconcile_available_screens()
+
+        StreamingServiceAccount.objects.filter(pk=account.pk).update(available_screens=7)
+        assert allocation.reconcile_available_screens(overlap=timedelta(0)) == {
+            "checked": 0,
+            "corrected": 0,
+            "high_water_mark": ScreenSubscription.objects.latest("updated_at").updated_at,
+        }
+        assert allocation.reconcile_available_screens(full=True)["corrected"] == 1
+
+    def test_reconcile_bulk_move_needs_full_run(self, create_user):
+        source, target = baker.make(StreamingServiceAccount, _quantity=2)
+        screen = baker.make(ScreenSubscription, streaming_account=source, user=None)
+        allocation.reconcile_available_screens()
+
+        ScreenSubscription.objects.filter(pk=screen.pk).update(
+            streaming_account=target, updated_at=timezone.now()
+        )
+        allocation.reconcile_available_screens(overlap=timedelta(0))
+        source.refresh_from_db()
+        target.refresh_from_db()
+        assert (source.available_screens, target.available_screens) == (1, 1)
+
+        assert allocation.reconcile_available_screens(full=True)["corrected"] == 1
+        source.refresh_from_db()
+        assert source.available_screens == 0
+
+    def test_reconcile_screens_command(self, create_user):
+        account = baker.make(StreamingServiceAccount)
+        baker.make(ScreenSubscription, streaming_account=account, user=None)
+        StreamingServiceAccount.objects.filter(pk=account.pk).update(available_screens=0)
+
+        call_command("reconcile_screens", "--full", stdout=io.StringIO())
+
+        account.refresh_from_db()
+        assert account.available_screens == 1
+
+    def test_seed_data_command_keeps_counters_consistent(self):
+        call_command(
+            "seed_data",
+            "--users=20",
+            "--services=3",
+            "--screens=200",
+            "--batch-size=50",
+            stdout=io.StringIO(),
+        )
+
+        assert ScreenSubscription.objects.count() == 200
+        assert Service.objects.count() == 3
+        assert allocation.reconcile_available_screens(full=True)["corrected"] == 0
+        # Sequences continue after the seeded ids.
+        assert baker.make(Service).pk == 4
@@ -0,0 +1,153 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from model_bakery import baker
+from api.models import ScreenSubscription, Service, StreamingServiceAccount
+from comparte.asgi import application
+
+
+@pytest.fixture
+def async_urls(settings):
+    """Fixture to resolve requests like the ASGI worker does."""
+    settings.ROOT_URLCONF = "comparte.urls_async"
+
+
+@pytest.fixture
+def screens(create_user):
+    services = baker.make(Service, _quantity=2)
+    for service in services:
+        for account in baker.make(StreamingServiceAccount, service=service, _quantity=3):
+            baker.make(ScreenSubscription, streaming_account=account, user=None)
+            baker.make(ScreenSubscription, streaming_account=account, user=create_user)
+    return services
+
+
+def sync_then_async(client, settings, url, **extra):
+    sync_response = client.get(url, **extra)
+    settings.ROOT_URLCONF = "comparte.urls_async"
+    async_response = client.get(url, **extra)
+    settings.ROOT_URLCONF = "comparte.urls"
+    return sync_response, async_response
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    @pytest.mark.parametrize("query", ["", "?service={service}", "?page_size=1"])
+    def test_screens_match_sync_listing(self, api_client, screens, settings, query):
+        url = "/api/screens/" + query.format(service=screens[1].pk)
+
+        sync_response, async_response = sync_then_async(api_client, settings, url)
+
+        assert async_response.status_code == status.HTTP_200_OK
+        assert async_response["Content-Type"] == "application/json"
+        assert json.loads(async_response.content)["results"] == (
+            json.loads(sync_response.content)["results"]
+        )
+
+    def test_screens_invalid_service_return_400(self, api_client, async_urls):
+        response = api_client.get("/api/screens/", {"service": 0})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "service" in json.loads(response.content)
+
+    def test_screens_pages_forward_and_back(self, api_client, screens, async_urls):
+        first = json.loads(api_client.get("/api/screens/", {"page_size": 2}).content)
+        second = json.loads(api_client.get(first["next"]).content)
+        back = json.loads(api_client.get(second["previous"]).content)
+
+        assert first["previous"] is None
+        assert len(first["results"]) == 2
+        assert second["results"][0]["streaming_account"] > first["results"][1]["streaming_account"]
+        assert [screen["id"] for screen in back["results"]] == [
+            screen["id"] for screen in first["results"]
+        ]
+
+    def test_invalid_cursor_return_404(self, api_client, async_urls):
+        response = api_client.get("/api/screens/my_screens/", {"cursor": "bm90IGEgY3Vyc29y"})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_my_screens_match_sync_listing(self, screens, create_user, settings, api_client):
+        api_client.credentials(HTTP_AUTHORIZATION=f"JWT {AccessToken.for_user(create_user)}")
+
+        sync_response, async_response = sync_then_async(
+            api_client, settings, "/api/screens/my_screens/"
+        )
+
+        assert async_response.status_code == status.HTTP_200_OK
+        assert json.loads(async_response.content)["results"] == (
+            json.loads(sync_response.content)["results"]
+        )
+
+    def test_my_screens_pages_through_ties(self, screens, create_user, api_client, async_urls):
+        ScreenSubscription.objects.filter(user=create_user).update(
+            subscription_date="2024-09-01T12:00:00Z"
+        )
+        api_client.credentials(HTTP_AUTHORIZATION=f"JWT {AccessToken.for_user(create_user)}")
+
+        ids = []
+        url = "/api/screens/my_screens/?page_size=4"
+        while url:
+            page = json.loads(api_client.get(url).content)
+            ids += [screen["id"] for screen in page["results"]]
+            url = page["next"]
+
+        assert ids == sorted(
+            ScreenSubscription.objects.filter(user=create_user).values_list("pk", flat=True)
+        )
+
+    def test_my_screens_invalid_token_return_401(self, api_client, async_urls):
+        api_client.credentials(HTTP_AUTHORIZATION="JWT not-a-token")
+
+        response = api_client.get("/api/screens/my_screens/")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_services_match_sync_catalog_and_etag(self, api_client, screens, settings):
+        sync_response, async_response = sync_then_async(api_client, settings, "/api/services/")
+
+        assert json.loads(async_response.content) == json.loads(sync_response.content)
+        assert async_response["ETag"] == sync_response["ETag"]
+        assert async_response["Cache-Control"] == sync_response["Cache-Control"]
+
+        settings.ROOT_URLCONF = "comparte.urls_async"
+        response = api_client.get("/api/services/", HTTP_IF_NONE_MATCH=sync_response["ETag"])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_writes_fall_through_to_sync_views(self, admin_user, async_urls):
+        response = admin_user.post("/api/services/", {"name": "New Service"})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Service.objects.filter(name="New Service").exists()
+
+
+# The handler runs views in a thread of its own, which cannot see an open test transaction.
+@pytest.mark.django_db(transaction=True)
+class TestASGIApplication:
+    def test_application_serves_async_views(self, screens):
+        async def request():
+            communicator = ApplicationCommunicator(
+                application,
+                {
+                    "type": "http",
+                    "method": "GET",
+                    "path": "/api/services/",
+                    "query_string": b"",
+                    "headers": [(b"host", b"testserver")],
+                },
+            )
+            await communicator.send_input({"type": "http.request"})
+            start = await communicator.receive_output(5)
+            body = await communicator.receive_output(5)
+            return start, body
+
+        start, body = async_to_sync(request)()
+
+        assert start["status"] == status.HTTP_200_OK
+        assert [service["id"] for service in json.loads(body["body"])] == [
+            service.pk for service in screens
+        ]
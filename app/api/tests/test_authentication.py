@@ -0,0 +1,88 @@
+import pytest
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from model_bakery import baker
+from api.models import ScreenSubscription
+from core.models import User
+
+
+@pytest.fixture
+def jwt_user():
+    """Fixture to create a user with a password."""
+    user = baker.make(User)
+    user.set_password("secret-password")
+    user.save()
+    return user
+
+
+@pytest.fixture
+def jwt_client(jwt_user):
+    """Fixture to authenticate an APIClient with a real JWT access token."""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"JWT {AccessToken.for_user(jwt_user)}")
+    return client
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    def test_user_lookup_is_cached(self, jwt_client, jwt_user, django_assert_num_queries):
+        baker.make(ScreenSubscription, user=jwt_user)
+        jwt_client.get("/api/screens/my_screens/")
+
+        # Only the screens themselves; the user comes from the cache.
+        with django_assert_num_queries(1):
+            response = jwt_client.get("/api/screens/my_screens/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == 1
+
+    def test_user_save_invalidates_cached_user(self, jwt_client, jwt_user):
+        jwt_client.get("/api/screens/my_screens/")
+
+        jwt_user.is_active = False
+        jwt_user.save()
+        response = jwt_client.get("/api/screens/my_screens/")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_user_changes_are_seen_after_save(self, jwt_client, jwt_user):
+        jwt_client.get("/auth/users/me/")
+
+        jwt_user.first_name = "Renamed"
+        jwt_user.save()
+        response = jwt_client.get("/auth/users/me/")
+
+        assert response.data["first_name"] == "Renamed"
+
+    def test_deleted_user_is_rejected(self, jwt_client, jwt_user):
+        jwt_client.get("/api/screens/my_screens/")
+
+        jwt_user.delete()
+        response = jwt_client.get("/api/screens/my_screens/")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_invalid_token_is_rejected(self, api_client):
+        api_client.credentials(HTTP_AUTHORIZATION="JWT not-a-token")
+
+        response = api_client.get("/api/screens/my_screens/")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_password_hash_is_not_cached(self, jwt_client, jwt_user):
+        jwt_client.get("/api/screens/my_screens/")
+
+        entry = cache.get(f"auth:user:{jwt_user.pk}")
+
+        assert jwt_user.password not in str(entry)
+        assert set(entry["fields"]) == {"id", "is_active", "is_staff", "is_superuser"}
+
+    def test_cached_user_loads_other_fields_on_access(self, jwt_client, jwt_user):
+        jwt_client.get("/auth/users/me/")
+
+        response = jwt_client.get("/auth/users/me/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["email"] == jwt_user.email
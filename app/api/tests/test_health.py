@@ -0,0 +1,121 @@
+import time
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.db import OperationalError, connection
+from rest_framework import status
+from comparte.asgi import application
+from core import health, metrics, startup
+
+
+@pytest.fixture
+def readiness(monkeypatch):
+    """Fixture to report a fresh readiness that is only refreshed by the test."""
+    readiness = health.Readiness()
+    monkeypatch.setattr(readiness, "start", lambda: None)
+    monkeypatch.setattr(health, "readiness", readiness)
+    return readiness
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Fixture to record metrics in a fresh registry."""
+    registry = metrics.Registry()
+    monkeypatch.setattr(metrics, "registry", registry)
+    return registry
+
+
+@pytest.mark.django_db
+class TestHealth:
+    def test_liveness_runs_no_query(
+        self, api_client, django_assert_num_queries, registry, settings
+    ):
+        settings.ALLOWED_HOSTS = ["budgetapp.podestalservers.com"]
+        with django_assert_num_queries(0):
+            # Probes use the pod address, which is not in ALLOWED_HOSTS.
+            response = api_client.get("/healthz", HTTP_HOST="10.1.2.3")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"status": "ok"}
+        assert registry.histograms == {}
+
+    def test_liveness_under_asgi(self):
+        async def request():
+            communicator = ApplicationCommunicator(
+                application,
+                {
+                    "type": "http",
+                    "method": "GET",
+                    "path": "/healthz",
+                    "query_string": b"",
+                    "headers": [(b"host", b"10.1.2.3")],
+                },
+            )
+            await communicator.send_input({"type": "http.request"})
+            return await communicator.receive_output(5)
+
+        assert async_to_sync(request)()["status"] == status.HTTP_200_OK
+
+    def test_not_ready_before_the_first_check(self, api_client, readiness):
+        response = api_client.get("/readyz")
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json() == {"status": "starting"}
+
+    def test_ready_when_the_database_is_migrated(
+        self, api_client, readiness, django_assert_num_queries
+    ):
+        readiness.refresh()
+
+        with django_assert_num_queries(0):
+            response = api_client.get("/readyz")
+
+        assert response.status_code == status.HTTP_200_OK
+        body = response.json()
+        assert body["status"] == "ready"
+        assert body["pending_migrations"] == 0
+        assert body["databases"]["default"]["reachable"]
+
+    def test_pending_migrations_are_reported(self, api_client, readiness):
+        with mock.patch.object(
+            startup, "unapplied_migrations", return_value=[("core", "0004_more")]
+        ):
+            readiness.refresh()
+
+        response = api_client.get("/readyz")
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json()["status"] == "unavailable"
+        assert response.json()["pending_migrations"] == 1
+
+    def test_unreachable_database_is_not_ready(self, api_client, readiness, caplog):
+        error = OperationalError('could not connect to server "db-primary.internal" (10.0.3.7)')
+        with mock.patch.object(connection, "cursor", side_effect=error):
+            readiness.refresh()
+
+        response = api_client.get("/readyz")
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json()["databases"]["default"] == {"reachable": False}
+        assert response.json()["pending_migrations"] is None
+        assert "10.0.3.7" not in response.content.decode()
+        assert "10.0.3.7" in caplog.text
+
+    def test_migrations_unapplied_after_being_ready_are_reported(self, readiness):
+        assert readiness.refresh()["pending_migrations"] == 0
+
+        with mock.patch.object(
+            startup, "unapplied_migrations", return_value=[("core", "0003_more")]
+        ):
+            assert readiness.refresh()["pending_migrations"] == 1
+
+    def test_old_results_are_stale(self, api_client, readiness, settings):
+        readiness.refresh()
+        readiness.checked_at = time.monotonic() - 4 * settings.READINESS_INTERVAL
+
+        response = api_client.get("/readyz")
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json()["status"] == "stale"
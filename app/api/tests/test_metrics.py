@@ -0,0 +1,87 @@
+import json
+import subprocess
+import sys
+
+import pytest
+from model_bakery import baker
+from rest_framework import status
+from api.models import Service
+from core import metrics
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Fixture to record metrics in a fresh registry."""
+    registry = metrics.Registry()
+    monkeypatch.setattr(metrics, "registry", registry)
+    return registry
+
+
+@pytest.mark.django_db
+class TestMetrics:
+    def test_requests_are_labelled_by_view_and_action(self, api_client, registry):
+        baker.make(Service)
+
+        api_client.get("/api/services/")
+        api_client.get("/api/services/")
+        api_client.post("/api/screens/claim/")
+
+        histograms = registry.histograms
+        assert histograms[("ServiceViewSet", "list", "GET", 200)][len(metrics.BUCKETS) + 1] > 0
+        assert sum(histograms[("ServiceViewSet", "list", "GET", 200)][:-1]) == 2
+        assert sum(histograms[("ScreenSubscriptionViewSet", "claim", "POST", 401)][:-1]) == 1
+
+    def test_unmatched_urls_are_grouped(self, api_client, registry):
+        api_client.get("/does-not-exist/")
+
+        assert ("unmatched", "get", "GET", 404) in registry.histograms
+
+    def test_metrics_endpoint_renders_prometheus_text(self, api_client, registry):
+        registry.observe(("ServiceViewSet", "list", "GET", 200), 0.02)
+        registry.observe(("ServiceViewSet", "list", "GET", 200), 3)
+
+        response = api_client.get("/metrics")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+        body = response.content.decode()
+        labels = 'view="ServiceViewSet",action="list",method="GET",status="200"'
+        assert f'comparte_request_duration_seconds_bucket{{{labels},le="0.01"}} 0' in body
+        assert f'comparte_request_duration_seconds_bucket{{{labels},le="0.025"}} 1' in body
+        assert f'comparte_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in body
+        assert f"comparte_request_duration_seconds_count{{{labels}}} 2" in body
+        assert f"comparte_request_duration_seconds_sum{{{labels}}} 3.02" in body
+
+    def test_metrics_are_summed_across_workers(self, api_client, registry, settings, tmp_path):
+        settings.METRICS_DIR = tmp_path
+        other_worker = metrics.Registry()
+        other_worker.name = "other-worker.json"
+        other_worker.observe(("ServiceViewSet", "list", "GET", 200), 0.02)
+        other_worker.flush()
+        registry.observe(("ServiceViewSet", "list", "GET", 200), 0.02)
+
+        totals = metrics.collect()
+
+        assert sum(totals[("ServiceViewSet", "list", "GET", 200)][:-1]) == 2
+        assert len(list(tmp_path.glob("*.json"))) == 2
+
+    def test_files_of_exited_workers_are_removed(self, registry, settings, tmp_path):
+        settings.METRICS_DIR = tmp_path
+        exited = subprocess.Popen([sys.executable, "-c", ""])
+        exited.wait()
+        dead_worker = tmp_path / f"{exited.pid}-0.json"
+        dead_worker.write_text(json.dumps({"pid": exited.pid, "histograms": [], "pools": {}}))
+        registry.observe(("ServiceViewSet", "list", "GET", 200), 0.02)
+
+        worker_reports = metrics.reports()
+
+        assert [report["pid"] for report in worker_reports] == [registry.pid]
+        assert not dead_worker.exists()
+
+    def test_requests_do_not_write_the_metrics_file(self, registry, settings, tmp_path):
+        settings.METRICS_DIR = tmp_path
+
+        registry.observe(("ServiceViewSet", "list", "GET", 200), 0.02)
+
+        assert registry.flusher.daemon and registry.flusher.is_alive()
+        assert list(tmp_path.glob("*.json")) == []
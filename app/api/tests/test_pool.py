@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+
+import pytest
+from django.db.utils import ConnectionHandler
+from core import pool
+
+
+@pytest.fixture
+def pooled_databases(tmp_path):
+    """Fixture for connections to a SQLite file through the pooled stand-in backend."""
+    created = []
+
+    def create(**options):
+        handler = ConnectionHandler(
+            {
+                "default": {"ENGINE": "django.db.backends.dummy"},
+                "pooled": {
+                    "ENGINE": "core.backends.sqlite3",
+                    "NAME": str(tmp_path / "pooled.sqlite3"),
+                    "POOL": options or True,
+                },
+            }
+        )
+        created.append(handler)
+        return handler
+
+    yield create
+    for handler in created:
+        handler.close_all()
+    stale = pool.pools.pop("pooled", None)
+    if stale is not None:
+        stale.close()
+
+
+def in_thread(func):
+    """Run func in another thread and return what it returned or raised."""
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = func()
+        except Exception as error:
+            outcome["error"] = error
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.django_db
+class TestConnectionPool:
+    def test_closed_connections_are_reused(self, pooled_databases):
+        connection = pooled_databases()["pooled"]
+
+        connection.ensure_connection()
+        raw = connection.connection
+        connection.close()
+        connection.ensure_connection()
+
+        assert connection.connection is raw
+        stats = pool.stats()["pooled"]
+        assert stats["checkouts"] == 2
+        assert stats["opened"] == 1
+        assert stats["in_use"] == 1
+
+    def test_checkout_times_out_when_the_pool_is_exhausted(self, pooled_databases):
+        databases = pooled_databases(MAX_SIZE=1, TIMEOUT=0.05)
+        databases["pooled"].ensure_connection()
+
+        thread, outcome = in_thread(lambda: databases["pooled"].ensure_connection())
+        thread.join()
+
+        assert isinstance(outcome["error"], pool.PoolTimeout)
+        assert pool.stats()["pooled"]["timeouts"] == 1
+
+    def test_waiting_checkout_gets_the_connection_given_back(self, pooled_databases):
+        databases = pooled_databases(MAX_SIZE=1, TIMEOUT=5)
+        connection = databases["pooled"]
+        connection.ensure_connection()
+        raw = connection.connection
+
+        def checkout():
+            databases["pooled"].ensure_connection()
+            return databases["pooled"].connection
+
+        thread, outcome = in_thread(checkout)
+        while pool.stats()["pooled"]["waiting"] == 0:
+            time.sleep(0.001)
+        connection.close()
+        thread.join()
+
+        assert outcome["result"] is raw
+
+    def test_unusable_idle_connections_are_replaced(self, pooled_databases):
+        connection = pooled_databases()["pooled"]
+        connection.ensure_connection()
+        broken = connection.connection
+        connection.close()
+        # Dropped while idle, as when the server restarts.
+        broken.close()
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+        assert connection.connection is not broken
+        stats = pool.stats()["pooled"]
+        assert stats["health_check_failures"] == 1
+        assert stats["size"] == 1
+
+    def test_recently_used_connections_skip_the_health_check(self, pooled_databases):
+        connection = pooled_databases(CHECK_AFTER=60)["pooled"]
+        connection.ensure_connection()
+        statements = []
+        connection.connection.set_trace_callback(statements.append)
+        connection.close()
+
+        connection.ensure_connection()
+
+        assert statements == []
+
+    def test_connections_idle_past_check_after_are_checked(self, pooled_databases):
+        connection = pooled_databases(CHECK_AFTER=0)["pooled"]
+        connection.ensure_connection()
+        statements = []
+        connection.connection.set_trace_callback(statements.append)
+        connection.close()
+
+        connection.ensure_connection()
+
+        assert "SELECT 1" in statements
+
+    def test_dirty_connections_are_reset_on_checkout(self, pooled_databases):
+        connection = pooled_databases()["pooled"]
+        connection.ensure_connection()
+        raw = connection.connection
+        raw.execute("CREATE TABLE leftover (id integer)")
+        raw.execute("BEGIN")
+        raw.execute("INSERT INTO leftover VALUES (1)")
+        # Given back without the rollback of a normal close, as by a request that died.
+        connection.connection = None
+        pool.pools["pooled"].putconn(raw)
+
+        connection.ensure_connection()
+
+        assert connection.connection is raw
+        assert raw.execute("SELECT count(*) FROM leftover").fetchone() == (0,)
+
+    def test_fill_opens_min_size_connections(self, pooled_databases):
+        pooled_databases(MIN_SIZE=2)["pooled"].fill_pool()
+
+        stats = pool.stats()["pooled"]
+        assert stats["idle"] == 2
+        assert stats["checkouts"] == 0
+
+    def test_idle_connections_over_min_size_expire(self):
+        connection_pool = pool.ConnectionPool("test", "test", min_size=1, idle_timeout=0)
+        first = connection_pool.getconn(FakeConnection)
+        second = connection_pool.getconn(FakeConnection)
+
+        connection_pool.putconn(first)
+        connection_pool.putconn(second)
+
+        assert first.closed and not second.closed
+        assert connection_pool.stats()["size"] == 1
+
+    def test_pools_are_reported_in_metrics(self, api_client, pooled_databases):
+        pooled_databases()["pooled"].ensure_connection()
+
+        response = api_client.get("/metrics")
+
+        labels = f'worker="{os.getpid()}",alias="pooled"'
+        body = response.content.decode()
+        assert f"comparte_db_pool_used_connections{{{labels}}} 1" in body
+        assert f"comparte_db_pool_checkouts_total{{{labels}}} 1" in body
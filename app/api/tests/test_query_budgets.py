@@ -0,0 +1,63 @@
+import pytest
+from model_bakery import baker
+from rest_framework import status
+from api.models import ScreenSubscription, Service, StreamingServiceAccount
+
+# Queries each endpoint may run, whatever the number of rows it returns. Authentication is
+# forced, so token lookups are not counted.
+QUERY_BUDGETS = [
+    ("/api/services/", 1),
+    ("/api/accounts/", 1),
+    ("/api/screens/", 2),
+    ("/api/screens/?service={service}", 3),
+    ("/api/screens/my_screens/", 1),
+]
+
+
+@pytest.fixture
+def screens(create_user):
+    services = baker.make(Service, _quantity=3)
+    for service in services:
+        accounts = baker.make(
+            StreamingServiceAccount,
+            owner=create_user,
+            service=service,
+            total_screens=4,
+            _quantity=3,
+        )
+        for account in accounts:
+            baker.make(ScreenSubscription, streaming_account=account, user=None, _quantity=2)
+            baker.make(ScreenSubscription, streaming_account=account, user=create_user, _quantity=2)
+    return services
+
+
+@pytest.mark.django_db
+class TestQueryBudgets:
+    @pytest.mark.parametrize("url, budget", QUERY_BUDGETS)
+    def test_endpoint_stays_within_query_budget(
+        self, authenticated_user, screens, query_budget, url, budget
+    ):
+        with query_budget(budget):
+            response = authenticated_user.get(url.format(service=screens[0].pk))
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_query_budget_fails_when_exceeded(self, query_budget):
+        with pytest.raises(pytest.fail.Exception, match="2 queries run, budget is 1"):
+            with query_budget(1):
+                list(Service.objects.all())
+                list(Service.objects.all())
+
+    def test_middleware_reports_queries_in_debug(self, api_client, screens, settings):
+        settings.DEBUG = True
+
+        # Outside INTERNAL_IPS so the debug toolbar stays out of the way.
+        response = api_client.get("/api/services/", REMOTE_ADDR="10.0.0.1")
+
+        assert response["X-DB-Query-Count"] == "1"
+        assert float(response["X-DB-Time-Ms"]) >= 0
+
+    def test_middleware_hides_headers_without_debug(self, api_client, screens):
+        response = api_client.get("/api/services/")
+
+        assert "X-DB-Query-Count" not in response
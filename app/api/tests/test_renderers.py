@@ -0,0 +1,84 @@
+import datetime
+import io
+from decimal import Decimal
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from model_bakery import baker
+from api.models import ScreenSubscription, StreamingServiceAccount
+from core import parsers, renderers
+
+DATA = {
+    "price_per_screen": Decimal("9.99"),
+    "subscription_date": datetime.datetime(2024, 9, 1, 12, 30, 5, 123456, tzinfo=datetime.UTC),
+    "local_date": datetime.datetime(
+        2024, 9, 1, 12, 30, tzinfo=datetime.timezone(-datetime.timedelta(hours=5))
+    ),
+    "day": datetime.date(2024, 9, 1),
+    "name": "Café\u2028line\u2029",
+    "lazy": gettext_lazy("Not found."),
+    "nested": [{"id": 1, "is_active": True, "user": None}],
+    1: "int key",
+}
+
+
+class TestORJSONRenderer:
+    def test_output_matches_json_renderer(self):
+        assert renderers.ORJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+    def test_indented_output_matches_json_renderer(self):
+        media_type = "application/json; indent=4"
+
+        assert renderers.ORJSONRenderer().render(DATA, media_type) == (
+            JSONRenderer().render(DATA, media_type)
+        )
+
+    def test_large_integers_fall_back_to_json(self):
+        assert renderers.ORJSONRenderer().render({"big": 2**70}) == b'{"big":%d}' % 2**70
+
+    def test_falls_back_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(renderers, "orjson", None)
+
+        assert renderers.ORJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+
+class TestORJSONParser:
+    def test_parses_json(self):
+        stream = io.BytesIO('{"service": 1, "name": "Café"}'.encode())
+
+        assert parsers.ORJSONParser().parse(stream) == {"service": 1, "name": "Café"}
+
+    def test_invalid_json_raises_parse_error(self):
+        with pytest.raises(ParseError):
+            parsers.ORJSONParser().parse(io.BytesIO(b'{"service": NaN}'))
+
+
+@pytest.mark.django_db
+class TestJSONResponses:
+    def test_decimals_are_rendered_as_numbers(self, authenticated_user, create_user):
+        account = baker.make(StreamingServiceAccount, price_per_screen=Decimal("9.99"))
+        baker.make(ScreenSubscription, streaming_account=account, user=create_user)
+
+        response = authenticated_user.get("/api/screens/my_screens/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b'"price_per_screen":9.99' in response.content
+
+    def test_json_body_is_parsed(self, authenticated_user):
+        response = authenticated_user.post(
+            "/api/screens/claim/",
+            b'{"service": 999}',
+            content_type="application/json",
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_malformed_json_body_returns_400(self, authenticated_user):
+        response = authenticated_user.post(
+            "/api/screens/claim/", b"{", content_type="application/json"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from model_bakery import baker
+from rest_framework import status
+from api import caching
+from api.models import ScreenSubscription, Service, StreamingServiceAccount
+from core import routers
+
+
+@pytest.fixture
+def replica(settings):
+    """Fixture to read from the second SQLite database of the development settings."""
+    settings.REPLICA_DATABASES = ["replica"]
+    return "replica"
+
+
+@pytest.fixture
+def free_screen():
+    """Fixture to create a screen on the primary that the user can claim."""
+    return baker.make(
+        ScreenSubscription,
+        streaming_account=baker.make(StreamingServiceAccount, available_screens=1),
+        user=None,
+        is_active=True,
+    )
+
+
+# Transactional, as the router keeps every read in a transaction on the primary.
+@pytest.mark.django_db(transaction=True, databases=[DEFAULT_DB_ALIAS, "replica"])
+class TestReplicaRouting:
+    def test_safe_requests_read_from_the_replica(self, api_client, replica):
+        baker.make(Service, name="On primary")
+        baker.make(Service, name="On replica", _using=replica)
+        # As if the catalog changed longer than REPLICA_PIN_SECONDS ago.
+        cache.clear()
+
+        response = api_client.get("/api/services/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [service["name"] for service in response.data] == ["On replica"]
+
+    def test_without_replicas_reads_use_the_primary(self, api_client):
+        baker.make(Service, name="On primary")
+
+        response = api_client.get("/api/services/")
+
+        assert [service["name"] for service in response.data] == ["On primary"]
+
+    def test_reads_stay_on_the_primary_after_an_invalidation(self, api_client, replica):
+        baker.make(Service, name="On primary")
+        baker.make(Service, name="On replica", _using=replica)
+        cache.clear()
+
+        caching.invalidate(caching.CATALOG_VERSION_KEY)
+        response = api_client.get("/api/services/")
+
+        assert [service["name"] for service in response.data] == ["On primary"]
+
+    def test_streamed_listings_read_from_the_replica(self, api_client, replica):
+        baker.make(StreamingServiceAccount, username="On primary")
+        baker.make(StreamingServiceAccount, username="On replica", _using=replica)
+        api_client.force_authenticate(user=baker.make("core.User", is_superuser=True))
+
+        response = api_client.get("/api/accounts/", {"stream": 1})
+
+        accounts = json.loads(b"".join(response.streaming_content))
+        assert [account["username"] for account in accounts] == ["On replica"]
+
+    def test_users_read_their_own_writes(
+        self, api_client, authenticated_user, replica, free_screen
+    ):
+        # The empty replica has not caught up with the claim below.
+        before = api_client.get("/api/screens/my_screens/")
+        claim = api_client.post("/api/screens/claim/")
+        after = api_client.get("/api/screens/my_screens/")
+
+        assert claim.status_code == status.HTTP_200_OK
+        assert before.data["results"] == []
+        assert [screen["id"] for screen in after.data["results"]] == [free_screen.id]
+
+    def test_writes_pin_only_their_user(
+        self, authenticated_user, create_user, replica, free_screen
+    ):
+        authenticated_user.post("/api/screens/claim/")
+
+        assert routers.pinned([routers.user_key(create_user)])
+        assert not routers.pinned([routers.user_key(baker.make("core.User"))])
+
+    def test_reads_in_a_transaction_use_the_primary(self, replica):
+        router = routers.ReplicaRouter()
+        token = routers.read_replica.set(True)
+        try:
+            assert router.db_for_read(Service) == replica
+            with transaction.atomic():
+                assert router.db_for_read(Service) is None
+        finally:
+            routers.read_replica.reset(token)
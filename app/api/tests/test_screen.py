@@ -1,6 +1,12 @@
+from decimal import Decimal
+
 import pytest
+from django.core.cache import cache
+from django.db import connection
 from rest_framework import status
+from rest_framework.fields import SerializerMethodField
 from model_bakery import baker
+from api import allocation, caching, serializers
 from api.models import ScreenSubscription, StreamingServiceAccount, Service
 
 
@@ -43,9 +49,10 @@ class TestScreenSubscription:
     def test_list_screens_unauthenticated_return_200(self, api_client, create_screen_subscription):
         response = api_client.get("/api/screens/")
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
+        assert len(response.data["results"]) == 1
         assert (
-            response.data[0]["streaming_account"] == create_screen_subscription.streaming_account.id
+            response.data["results"][0]["streaming_account"]
+            == create_screen_subscription.streaming_account.id
         )
 
     def test_get_queryset_no_active_screens_unauthenticated_return_200(self, api_client):
@@ -53,7 +60,7 @@ class TestScreenSubscription:
         response = api_client.get("/api/screens/")
 
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 0
+        assert len(response.data["results"]) == 0
 
     def test_get_queryset_multiple_accounts_unauthenticated_return_200(self, api_client):
         account_1 = baker.make(StreamingServiceAccount, total_screens=4)
@@ -69,8 +76,8 @@ class TestScreenSubscription:
         response = api_client.get("/api/screens/")
 
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1  # Only account_2 has the least available screens
-        assert response.data[0]["streaming_account"] == account_2.id
+        assert len(response.data["results"]) == 1  # Only account_2 has the least available screens
+        assert response.data["results"][0]["streaming_account"] == account_2.id
 
     def test_get_queryset_minimum_screens_unauthenticated_return_200(self, api_client):
 
@@ -87,25 +94,130 @@ class TestScreenSubscription:
         response = api_client.get("/api/screens/")
 
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1  # Only account_1 should be returned
-        assert response.data[0]["streaming_account"] == account_1.id
+        assert len(response.data["results"]) == 1  # Only account_1 should be returned
+        assert response.data["results"][0]["streaming_account"] == account_1.id
+
+    def test_available_screens_counter_tracks_free_screens(self, api_client, create_user):
+        account = baker.make(StreamingServiceAccount, available_screens=0)
+        screens = baker.make(
+            ScreenSubscription, streaming_account=account, is_active=True, user=None, _quantity=3
+        )
+        account.refresh_from_db()
+        assert account.available_screens == 3
+
+        screens[0].user = create_user
+        screens[0].save()
+        screens[1].delete()
+        account.refresh_from_db()
+        assert account.available_screens == 1
+
+    def test_list_screens_filtered_by_service_return_200(self, api_client, create_service):
+        account_1 = baker.make(StreamingServiceAccount, service=create_service)
+        account_2 = baker.make(StreamingServiceAccount, service=create_service)
+        other_account = baker.make(StreamingServiceAccount)
+
+        baker.make(
+            ScreenSubscription, streaming_account=account_1, is_active=True, user=None, _quantity=3
+        )
+        baker.make(
+            ScreenSubscription, streaming_account=account_2, is_active=True, user=None, _quantity=2
+        )
+        baker.make(ScreenSubscription, streaming_account=other_account, is_active=True, user=None)
+
+        response = api_client.get("/api/screens/", {"service": create_service.id})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == 1
+        assert response.data["results"][0]["streaming_account"] == account_2.id
+
+    def test_list_screens_is_cursor_paginated_by_account(self, api_client):
+        accounts = baker.make(StreamingServiceAccount, _quantity=3)
+        for account in accounts:
+            baker.make(ScreenSubscription, streaming_account=account, user=None)
+
+        first = api_client.get("/api/screens/", {"page_size": 2})
+        last = api_client.get(first.data["next"])
+
+        assert [screen["streaming_account"] for screen in first.data["results"]] == [
+            accounts[0].id,
+            accounts[1].id,
+        ]
+        assert [screen["streaming_account"] for screen in last.data["results"]] == [accounts[2].id]
+        assert last.data["next"] is None
+
+    def test_list_screens_cached_links_use_the_host_of_each_request(self, api_client):
+        accounts = baker.make(StreamingServiceAccount, _quantity=2)
+        for account in accounts:
+            baker.make(ScreenSubscription, streaming_account=account, user=None)
+
+        api_client.get("/api/screens/", {"page_size": 1}, HTTP_HOST="internal:8000")
+        response = api_client.get("/api/screens/", {"page_size": 1}, HTTP_HOST="comparte.test")
+
+        assert response.data["next"].startswith("http://comparte.test/api/screens/?")
+        assert "page_size=1" in response.data["next"]
+
+    def test_list_screens_unknown_service_return_400(self, api_client):
+        response = api_client.get("/api/screens/", {"service": 0})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_screens_served_from_cache(
+        self, api_client, create_screen_subscription, django_assert_num_queries
+    ):
+        api_client.get("/api/screens/")
+
+        with django_assert_num_queries(0):
+            response = api_client.get("/api/screens/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"][0]["id"] == create_screen_subscription.id
+
+    def test_list_screens_cache_invalidated_on_screen_change(
+        self, api_client, create_user, create_screen_subscription
+    ):
+        api_client.get("/api/screens/")
+
+        create_screen_subscription.user = create_user
+        create_screen_subscription.save()
+
+        response = api_client.get("/api/screens/")
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == 0
+
+    def test_list_screens_cache_ignores_unknown_params(
+        self, api_client, create_screen_subscription, django_assert_num_queries
+    ):
+        api_client.get("/api/screens/")
+
+        with django_assert_num_queries(0):
+            response = api_client.get("/api/screens/", {"utm_source": "newsletter"})
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_list_screens_serves_stale_listing_while_another_worker_recomputes(self):
+        caching.cached_availability("", lambda: ["stale"])
+        caching.invalidate()
+        cache.add(f"screens:availability::lock:{caching.version()}", True)
+
+        assert caching.cached_availability("", lambda: ["fresh"]) == ["stale"]
 
     def test_list_screens_authenticated_return_200(
         self, authenticated_user, create_screen_subscription
     ):
         response = authenticated_user.get("/api/screens/")
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
+        assert len(response.data["results"]) == 1
         assert (
-            response.data[0]["streaming_account"] == create_screen_subscription.streaming_account.id
+            response.data["results"][0]["streaming_account"]
+            == create_screen_subscription.streaming_account.id
         )
 
     def test_list_screens_admin_return_200(self, admin_user, create_screen_subscription):
         response = admin_user.get("/api/screens/")
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
+        assert len(response.data["results"]) == 1
         assert (
-            response.data[0]["streaming_account"] == create_screen_subscription.streaming_account.id
+            response.data["results"][0]["streaming_account"]
+            == create_screen_subscription.streaming_account.id
         )
 
     def test_retrieve_screen_subscription_unauthenticated_return_200(
@@ -132,12 +244,12 @@ class TestScreenSubscription:
     def test_my_screens_unauthenticated_return_empty(self, api_client):
         response = api_client.get("/api/screens/my_screens/")
         assert response.status_code == status.HTTP_200_OK
-        assert response.data == []
+        assert response.data["results"] == []
 
     def test_my_screens_authenticated_no_screens_return_empty(self, authenticated_user):
         response = authenticated_user.get("/api/screens/my_screens/")
         assert response.status_code == status.HTTP_200_OK
-        assert response.data == []
+        assert response.data["results"] == []
 
     def test_my_screens_authenticated_with_screens_return_data(
         self, authenticated_user, create_user
@@ -152,8 +264,8 @@ class TestScreenSubscription:
 
         response = authenticated_user.get("/api/screens/my_screens/")
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
-        assert response.data[0]["streaming_account"] == streaming_account.id
+        assert len(response.data["results"]) == 1
+        assert response.data["results"][0]["streaming_account"] == streaming_account.id
 
     def test_my_screens_authenticated_multiple_screens_return_data(
         self, authenticated_user, create_user
@@ -177,9 +289,181 @@ class TestScreenSubscription:
 
         response = authenticated_user.get("/api/screens/my_screens/")
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 2
-        assert response.data[0]["streaming_account"] == streaming_account_1.id
-        assert response.data[1]["streaming_account"] == streaming_account_2.id
+        assert len(response.data["results"]) == 2
+        assert response.data["results"][0]["streaming_account"] == streaming_account_1.id
+        assert response.data["results"][1]["streaming_account"] == streaming_account_2.id
+
+    def test_my_screens_embeds_service_and_price_in_one_query(
+        self,
+        authenticated_user,
+        create_user,
+        create_streaming_service_account,
+        django_assert_num_queries,
+    ):
+        baker.make(
+            ScreenSubscription,
+            user=create_user,
+            streaming_account=create_streaming_service_account,
+            _quantity=3,
+        )
+
+        with django_assert_num_queries(1):
+            response = authenticated_user.get("/api/screens/my_screens/")
+
+        assert response.status_code == status.HTTP_200_OK
+        screen = response.data["results"][0]
+        assert screen["service_name"] == create_streaming_service_account.service.name
+        assert screen["price_per_screen"] == Decimal("9.99")
+
+    def test_my_screens_paginates_with_cursor(self, authenticated_user, create_user):
+        baker.make(ScreenSubscription, user=create_user, _quantity=3)
+
+        first_page = authenticated_user.get("/api/screens/my_screens/", {"page_size": 2})
+        second_page = authenticated_user.get(first_page.data["next"])
+
+        assert len(first_page.data["results"]) == 2
+        assert len(second_page.data["results"]) == 1
+        assert second_page.data["next"] is None
+
+    def test_claim_screen_unauthenticated_return_401(self, api_client, create_screen_subscription):
+        response = api_client.post("/api/screens/claim/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_claim_screen_authenticated_return_200(
+        self, authenticated_user, create_user, create_screen_subscription
+    ):
+        response = authenticated_user.post("/api/screens/claim/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["id"] == create_screen_subscription.id
+        assert response.data["user"] == create_user.id
+        create_screen_subscription.streaming_account.refresh_from_db()
+        assert create_screen_subscription.streaming_account.available_screens == 0
+
+    def test_claim_screen_fills_least_available_account_first(
+        self, authenticated_user, create_user
+    ):
+        account_1 = baker.make(StreamingServiceAccount)
+        account_2 = baker.make(StreamingServiceAccount)
+        baker.make(
+            ScreenSubscription, streaming_account=account_1, is_active=True, user=None, _quantity=3
+        )
+        baker.make(
+            ScreenSubscription, streaming_account=account_2, is_active=True, user=None, _quantity=2
+        )
+
+        response = authenticated_user.post("/api/screens/claim/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["streaming_account"] == account_2.id
+
+    @pytest.mark.parametrize(
+        "strategy, expected_account",
+        [("best_fit", 1), ("cheapest", 0), ("spread", 2), ("round_robin", 0)],
+    )
+    def test_claim_screen_uses_service_strategy(
+        self, authenticated_user, create_service, strategy, expected_account
+    ):
+        create_service.allocation_strategy = strategy
+        create_service.save()
+        accounts = [
+            baker.make(StreamingServiceAccount, service=create_service, price_per_screen=price)
+            for price in (3, 5, 9)
+        ]
+        for account, free in zip(accounts, (2, 1, 3)):
+            baker.make(
+                ScreenSubscription,
+                streaming_account=account,
+                is_active=True,
+                user=None,
+                _quantity=free,
+            )
+        baker.make(ScreenSubscription, is_active=True, user=None)
+
+        response = authenticated_user.post("/api/screens/claim/", {"service": create_service.id})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["streaming_account"] == accounts[expected_account].id
+
+    def test_claim_screen_round_robin_takes_turns(self, authenticated_user, create_service):
+        create_service.allocation_strategy = "round_robin"
+        create_service.save()
+        accounts = baker.make(StreamingServiceAccount, service=create_service, _quantity=2)
+        for account in accounts:
+            baker.make(
+                ScreenSubscription,
+                streaming_account=account,
+                is_active=True,
+                user=None,
+                _quantity=2,
+            )
+
+        claimed = [
+            authenticated_user.post("/api/screens/claim/", {"service": create_service.id}).data[
+                "streaming_account"
+            ]
+            for _ in range(3)
+        ]
+        assert claimed == [accounts[0].id, accounts[1].id, accounts[0].id]
+
+    def test_claim_screen_round_robin_turn_is_taken_before_the_claim(self, create_service):
+        accounts = baker.make(StreamingServiceAccount, service=create_service, _quantity=2)
+        for account in accounts:
+            baker.make(ScreenSubscription, streaming_account=account, is_active=True, user=None)
+
+        # Two claimers between their pick and their claim get different turns.
+        first = allocation.RoundRobin(create_service).claim_account()
+        second = allocation.RoundRobin(create_service).claim_account()
+
+        assert [first, second] == accounts
+
+    def test_claim_screen_passes_over_account_without_free_screens(
+        self, create_user, create_service
+    ):
+        behind, other = baker.make(StreamingServiceAccount, service=create_service, _quantity=2)
+        baker.make(
+            ScreenSubscription, streaming_account=other, is_active=True, user=None, _quantity=2
+        )
+        # Counter says one free screen, but it was taken.
+        StreamingServiceAccount.objects.filter(pk=behind.pk).update(available_screens=1)
+
+        screen = allocation.claim_screen(create_user, allocation.BestFit(create_service))
+
+        assert screen.streaming_account_id == other.id
+
+    def test_claim_screen_drops_it_from_cached_listing(self, api_client, create_user):
+        account = baker.make(StreamingServiceAccount)
+        screen = baker.make(ScreenSubscription, streaming_account=account, user=None)
+        assert [row["id"] for row in api_client.get("/api/screens/").data["results"]] == [
+            screen.id
+        ]
+
+        assert allocation.claim_account_screen(create_user, account) == screen
+
+        assert api_client.get("/api/screens/").data["results"] == []
+
+    def test_claim_screen_with_row_locks_decrements_counter(
+        self, api_client, create_user, monkeypatch
+    ):
+        account = baker.make(StreamingServiceAccount)
+        baker.make(ScreenSubscription, streaming_account=account, user=None, _quantity=2)
+        assert len(api_client.get("/api/screens/").data["results"]) == 1
+        monkeypatch.setattr(connection.features, "has_select_for_update_skip_locked", True)
+        # The account counter is decremented in place, not recounted by the save signals.
+        monkeypatch.setattr(allocation, "refresh_available_screens", None)
+
+        screen = allocation.claim_account_screen(create_user, account)
+
+        assert screen.user == create_user
+        account.refresh_from_db()
+        assert account.available_screens == 1
+        listing = api_client.get("/api/screens/")
+        assert [row["id"] for row in listing.data["results"]] != [screen.id]
+
+    def test_claim_screen_unknown_service_return_404(self, authenticated_user):
+        response = authenticated_user.post("/api/screens/claim/", {"service": 0})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_claim_screen_none_available_return_409(self, authenticated_user):
+        response = authenticated_user.post("/api/screens/claim/")
+        assert response.status_code == status.HTTP_409_CONFLICT
 
     def test_create_screen_subscription_unauthenticated_return_401(
         self, api_client, create_streaming_service_account
@@ -231,6 +515,24 @@ class TestScreenSubscription:
         create_screen_subscription.refresh_from_db()
         assert create_screen_subscription.payment_status == "C"
 
+    def test_partial_update_moving_screen_recounts_both_accounts(
+        self, api_client, authenticated_user
+    ):
+        account_a, account_b = baker.make(StreamingServiceAccount, _quantity=2)
+        screen = baker.make(ScreenSubscription, streaming_account=account_a, user=None)
+        baker.make(ScreenSubscription, streaming_account=account_b, user=None, _quantity=3)
+
+        response = authenticated_user.patch(
+            f"/api/screens/{screen.id}/", {"streaming_account": account_b.id}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        account_a.refresh_from_db()
+        account_b.refresh_from_db()
+        assert (account_a.available_screens, account_b.available_screens) == (0, 4)
+        listing = api_client.get("/api/screens/")
+        assert [row["streaming_account"] for row in listing.data["results"]] == [account_b.id]
+
     def test_partial_update_screen_subscription_admin_return_200(
         self, admin_user, create_screen_subscription
     ):
@@ -260,3 +562,38 @@ class TestScreenSubscription:
         response = admin_user.delete(f"/api/screens/{create_screen_subscription.id}/")
         assert response.status_code == status.HTTP_204_NO_CONTENT
         assert not ScreenSubscription.objects.filter(id=create_screen_subscription.id).exists()
+
+
+@pytest.mark.django_db
+class TestValuesSerializer:
+    @pytest.mark.parametrize(
+        "serializer_class",
+        [
+            serializers.ScreenSubscriptionSerializer,
+            serializers.MyScreenSubscriptionSerializer,
+            serializers.StreamingServiceAccountSerializer,
+            serializers.ServiceSerializer,
+        ],
+    )
+    def test_matches_model_serializer_output(self, create_user, serializer_class):
+        account = baker.make(
+            StreamingServiceAccount, price_per_screen=Decimal("9.9"), total_screens=2
+        )
+        baker.make(ScreenSubscription, streaming_account=account, user=create_user)
+        baker.make(ScreenSubscription, streaming_account=account, user=None, is_active=False)
+        queryset = serializer_class.Meta.model.objects.order_by("pk")
+
+        fast = serializers.values_serializer(serializer_class)
+
+        assert fast.to_representation(fast.values(queryset)) == (
+            serializer_class(queryset, many=True).data
+        )
+
+    def test_serializers_needing_instances_are_not_supported(self):
+        class UserScreenSerializer(serializers.ScreenSubscriptionSerializer):
+            owner = SerializerMethodField()
+
+            class Meta(serializers.ScreenSubscriptionSerializer.Meta):
+                fields = serializers.ScreenSubscriptionSerializer.Meta.fields + ["owner"]
+
+        assert serializers.values_serializer(UserScreenSerializer) is None
@@ -103,3 +103,51 @@ class TestService:
         response = admin_user.delete(f"/api/services/{create_service.id}/")
         assert response.status_code == status.HTTP_204_NO_CONTENT
         assert not Service.objects.filter(id=create_service.id).exists()
+
+
+@pytest.mark.django_db
+class TestServiceCatalogCaching:
+    def test_list_sends_etag_and_cache_control(self, api_client, create_service):
+        response = api_client.get("/api/services/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"].startswith('"')
+        assert "public" in response["Cache-Control"]
+        assert "max-age=60" in response["Cache-Control"]
+
+    def test_matching_etag_returns_304_without_queries(
+        self, api_client, create_service, django_assert_num_queries
+    ):
+        etag = api_client.get("/api/services/")["ETag"]
+
+        with django_assert_num_queries(0):
+            response = api_client.get("/api/services/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+        assert not response.content
+
+    def test_detail_uses_catalog_etag(self, api_client, create_service):
+        etag = api_client.get(f"/api/services/{create_service.id}/")["ETag"]
+
+        response = api_client.get(f"/api/services/{create_service.id}/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_service_write_changes_etag(self, api_client, admin_user, create_service):
+        etag = api_client.get("/api/services/")["ETag"]
+
+        admin_user.patch(f"/api/services/{create_service.id}/", {"name": "Renamed"})
+        response = api_client.get("/api/services/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+        assert response.data[0]["name"] == "Renamed"
+
+    def test_etag_depends_on_format(self, api_client, create_service):
+        etag = api_client.get("/api/services/")["ETag"]
+
+        response = api_client.get("/api/services/?format=api", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
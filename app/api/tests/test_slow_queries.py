@@ -0,0 +1,84 @@
+import logging
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from api.models import Service
+from core import slow_queries
+
+
+@pytest.fixture
+def slow_query_log(caplog):
+    """Fixture to capture the slow query log, which does not propagate to the root logger."""
+    logger = logging.getLogger("comparte.slow_queries")
+    logger.addHandler(caplog.handler)
+    yield caplog
+    logger.removeHandler(caplog.handler)
+
+
+def log_queries(**options):
+    options = {"threshold_ms": 0, "explain_sample": 0, "explain_analyze": False, **options}
+    return connection.execute_wrapper(slow_queries.SlowQueryLogger(connection, **options))
+
+
+@pytest.mark.django_db
+class TestSlowQueryLog:
+    def test_logs_queries_over_threshold_with_stack(self, slow_query_log):
+        with log_queries():
+            list(Service.objects.all())
+
+        (record,) = slow_query_log.records
+        assert record.sql.startswith("SELECT")
+        assert "test_slow_queries.py" in record.getMessage()
+        assert "Plan:" not in record.getMessage()
+
+    def test_fast_queries_are_not_logged(self, slow_query_log):
+        with log_queries(threshold_ms=60_000):
+            list(Service.objects.all())
+
+        assert slow_query_log.records == []
+
+    def test_sampled_selects_are_explained(self, slow_query_log):
+        baker.make(Service)
+
+        with log_queries(explain_sample=1):
+            list(Service.objects.filter(name="Netflix"))
+            Service.objects.update(name="Netflix")
+
+        select, update = slow_query_log.records
+        assert "Plan:" in select.getMessage()
+        assert "api_service" in select.getMessage().split("Plan:")[1]
+        assert "Plan:" not in update.getMessage()
+
+    def test_records_view_of_request(self, api_client, slow_query_log, settings):
+        with log_queries():
+            api_client.get("/api/services/")
+
+        assert slow_query_log.records[0].view == ("ServiceViewSet", "list")
+
+    def test_installed_once_per_connection(self, settings):
+        wrappers = connection.execute_wrappers[:]
+        slow_queries.install(sender=None, connection=connection)
+        slow_queries.install(sender=None, connection=connection)
+
+        installed = [
+            wrapper
+            for wrapper in connection.execute_wrappers
+            if isinstance(wrapper, slow_queries.SlowQueryLogger)
+        ]
+        connection.execute_wrappers[:] = wrappers
+        assert len(installed) == 1
+
+    def test_failed_explain_is_rolled_back_to_a_savepoint(self, slow_query_log, monkeypatch):
+        monkeypatch.setattr(
+            connection.ops, "explain_query_prefix", lambda **options: "NOT A PREFIX"
+        )
+
+        with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+            with log_queries(explain_sample=1):
+                list(Service.objects.all())
+            list(Service.objects.all())
+
+        assert "EXPLAIN failed" in slow_query_log.records[0].getMessage()
+        assert any(query["sql"].startswith("ROLLBACK TO SAVEPOINT") for query in queries)
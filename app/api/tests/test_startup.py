@@ -0,0 +1,112 @@
+import io
+from itertools import islice
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.migrations.recorder import MigrationRecorder
+from core import startup
+
+
+@pytest.fixture
+def migrations_package(tmp_path, monkeypatch, settings):
+    """Fixture to point the core app at a migrations package of its own."""
+    package = tmp_path / "startup_migrations"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "0001_initial.py").write_text("# first\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    settings.MIGRATION_MODULES = {"core": "startup_migrations"}
+    return package
+
+
+def run_startup(*args):
+    stdout = io.StringIO()
+    with mock.patch("core.management.commands.startup.call_command") as command:
+        call_command("startup", "--skip-collectstatic", *args, stdout=stdout)
+    return [call.args[0] for call in command.call_args_list], stdout.getvalue()
+
+
+class TestWaitForDatabase:
+    def test_delays_grow_exponentially_up_to_the_cap(self, monkeypatch):
+        monkeypatch.setattr(startup.random, "uniform", lambda low, high: high)
+
+        delays = list(islice(startup.backoff_delays(base=0.1, cap=1.0), 6))
+
+        assert delays == pytest.approx([0.1, 0.2, 0.4, 0.8, 1.0, 1.0])
+
+    def test_delays_are_jittered(self):
+        delays = list(islice(startup.backoff_delays(base=1, cap=1), 50))
+
+        assert all(0 <= delay <= 1 for delay in delays)
+        assert len(set(delays)) > 1
+
+    def test_connecting_is_retried(self, monkeypatch):
+        outcomes = iter([OperationalError("starting up"), OperationalError("starting up"), None])
+
+        def ensure_connection():
+            outcome = next(outcomes)
+            if outcome is not None:
+                raise outcome
+
+        monkeypatch.setattr(connection, "ensure_connection", ensure_connection)
+        sleeps = []
+
+        assert startup.wait_for_database(sleep=sleeps.append) == 3
+        assert len(sleeps) == 2
+
+    def test_gives_up_after_the_timeout(self, monkeypatch):
+        def ensure_connection():
+            raise OperationalError("down")
+
+        monkeypatch.setattr(connection, "ensure_connection", ensure_connection)
+
+        with pytest.raises(OperationalError):
+            startup.wait_for_database(timeout=0, sleep=lambda delay: None)
+
+
+@pytest.mark.django_db
+class TestUnappliedMigrations:
+    def test_migrated_database_has_none(self, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            assert startup.unapplied_migrations() == []
+
+    def test_new_migration_files_are_unapplied(self, migrations_package):
+        (migrations_package / "0002_more.py").write_text("# second\n")
+
+        assert startup.unapplied_migrations() == [("core", "0002_more")]
+
+    def test_migrations_unapplied_by_hand_are_found(self):
+        MigrationRecorder(connection).record_unapplied("core", "0001_initial")
+
+        assert startup.unapplied_migrations() == [("core", "0001_initial")]
+
+
+@pytest.mark.django_db
+class TestStartupCommand:
+    def test_migrates_when_a_migration_is_unapplied(self):
+        MigrationRecorder(connection).record_unapplied(
+            "api", "0011_streamingserviceaccount_owner_id_index"
+        )
+
+        commands, output = run_startup()
+
+        assert commands == ["migrate"]
+        assert "wait_for_db" in output and "1 unapplied" in output
+
+    def test_skips_migrate_when_every_migration_is_applied(self):
+        commands, output = run_startup()
+
+        assert commands == []
+        assert "skipped, every migration is applied" in output
+
+    def test_migrates_when_forced(self):
+        commands, _ = run_startup("--force-migrate")
+
+        assert commands == ["migrate"]
+
+    def test_warm_up_times_each_step(self):
+        timings = startup.warm_up()
+
+        assert set(timings) == {"urls", "serializers", "databases"}
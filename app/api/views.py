@@ -1,45 +1,293 @@
+from itertools import islice
+
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import permissions
-from django.db.models import Count, Q, Min
+from rest_framework import status
+from rest_framework.generics import get_object_or_404
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from django.http import QueryDict, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django_filters.utils import translate_validation
+
+from core import routers
 
 # from rest_framework.decorators import action
 # from rest_framework.response import Response
+from . import allocation
+from . import caching
+from . import filters
+from . import importers
 from . import models
+from . import pagination
+from . import parsers
 from . import serializers
 
 
-class ServiceViewSet(ModelViewSet):
+def available_screens(queryset, query_params):
+    """The screens offered for the availability filter in query_params, one per account."""
+    availability = filters.ScreenAvailabilityFilter(
+        query_params, queryset=models.StreamingServiceAccount.objects.all()
+    )
+    if not availability.is_valid():
+        raise translate_validation(availability.errors)
+
+    strategy = allocation.get_strategy(availability.form.cleaned_data.get("service"))
+    return queryset.filter(
+        pk__in=allocation.allocated_screen_ids(availability.qs, strategy)
+    ).order_by("streaming_account")
+
+
+def availability_params_key(query_params):
+    """Cache key part for the availability listing, from the params that change its content."""
+    paginator = pagination.ScreenAvailabilityPagination
+    names = [
+        *filters.ScreenAvailabilityFilter.base_filters,
+        paginator.cursor_query_param,
+        paginator.page_size_query_param,
+    ]
+    return caching.params_key(query_params, names)
+
+
+class ReplicaReadMixin:
+    """
+    Read safe requests from the replicas in settings.REPLICA_DATABASES.
+
+    A successful write pins its user to the primary for a while, as does an invalidation of one
+    of the cache versions from get_replica_pin_keys, whose listings must be refilled with the
+    change.
+    """
+
+    replica_pin_keys = ()
+
+    def get_replica_pin_keys(self):
+        return self.replica_pin_keys
+
+    def dispatch(self, request, *args, **kwargs):
+        token = routers.read_replica.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            routers.read_replica.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication and permissions are checked against the primary.
+        super().initial(request, *args, **kwargs)
+        if request.method in permissions.SAFE_METHODS:
+            keys = list(self.get_replica_pin_keys())
+            if request.user.is_authenticated:
+                keys.append(routers.user_key(request.user))
+            routers.read_replica.set(not routers.pinned(keys))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            request.method not in permissions.SAFE_METHODS
+            and response.status_code < status.HTTP_400_BAD_REQUEST
+            and request.user.is_authenticated
+        ):
+            routers.pin(routers.user_key(request.user))
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ValuesListMixin:
+    """
+    Serve GET list responses from .values() rows through serializers.ValuesSerializer.
+
+    Serializers with fields that need model instances keep the regular list.
+    """
+
+    # Rows fetched from the server-side cursor and rendered per chunk of a streamed list.
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        return self.values_list_response(
+            self.filter_queryset(self.get_queryset()), self.get_serializer_class()
+        )
+
+    def values_list_response(self, queryset, serializer_class):
+        fast = serializers.values_serializer(serializer_class)
+        if fast is None:
+            page = self.paginate_queryset(queryset)
+            serializer = serializer_class(
+                page if page is not None else queryset,
+                many=True,
+                context=self.get_serializer_context(),
+            )
+            if page is not None:
+                return self.get_paginated_response(serializer.data)
+            return Response(serializer.data)
+
+        # Cursor pagination reads its position from the ordering fields of the last row.
+        ordering = getattr(self.paginator, "ordering", None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        rows = fast.values(queryset, *(field.lstrip("-") for field in ordering))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast.to_representation(page))
+        return Response(fast.to_representation(rows))
+
+    def stream_list_response(self, queryset, serializer_class):
+        """
+        Stream the whole queryset as a JSON array without holding it in memory.
+
+        Rows come from a server-side cursor and are rendered stream_chunk_size at a time, so
+        memory stays flat whatever the number of rows. They are read after dispatch has
+        returned, from the database the request was routed to.
+        """
+        fast = serializers.values_serializer(serializer_class)
+        if fast is not None:
+            rows = fast.values(queryset).iterator(chunk_size=self.stream_chunk_size)
+            represent = fast.to_representation
+        else:
+            rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+            context = self.get_serializer_context()
+
+            def represent(batch):
+                return serializer_class(batch, many=True, context=context).data
+
+        renderer = self.request.accepted_renderer
+        media_type = self.request.accepted_media_type
+
+        read_replica = routers.read_replica.get()
+
+        def chunks():
+            yield b"["
+            separator = b""
+            while True:
+                token = routers.read_replica.set(read_replica)
+                try:
+                    batch = list(islice(rows, self.stream_chunk_size))
+                finally:
+                    routers.read_replica.reset(token)
+                if not batch:
+                    break
+                # Each chunk is rendered as an array and stripped of its brackets.
+                yield separator + renderer.render(represent(batch), media_type)[1:-1]
+                separator = b","
+            yield b"]"
+
+        return StreamingHttpResponse(chunks(), content_type=renderer.media_type)
+
+
+class ServiceViewSet(ReplicaReadMixin, ModelViewSet):
 
     queryset = models.Service.objects.all()
     serializer_class = serializers.ServiceSerializer
+    replica_pin_keys = (caching.CATALOG_VERSION_KEY,)
+    # The catalog is small and cached whole by clients, so it is not paginated.
+    pagination_class = None
+    # Seconds clients and nginx may reuse a catalog response before revalidating it.
+    cache_max_age = 60
 
     def get_permissions(self):
         if self.request.method in ["POST", "PUT", "PATCH", "DELETE"]:
             return [permissions.IsAdminUser()]
         return [permissions.AllowAny()]
 
-
-class StreamingServiceAccountViewSet(ModelViewSet):
+    def catalog_etag(self):
+        # Read before the catalog itself, so a concurrent write can only make the tag older.
+        if not hasattr(self, "_catalog_etag"):
+            current = caching.version(caching.CATALOG_VERSION_KEY)
+            self._catalog_etag = f'"{current}-{self.request.accepted_renderer.format}"'
+        return self._catalog_etag
+
+    def not_modified(self, request):
+        """A 304 response when the client already holds the current catalog, without a query."""
+        if_none_match = request.headers.get("If-None-Match")
+        etags = parse_etags(if_none_match) if if_none_match else []
+        if etags == ["*"] or self.catalog_etag() in etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return None
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        not_modified = self.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        return super().retrieve(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method in ("GET", "HEAD") and response.status_code in (
+            status.HTTP_200_OK,
+            status.HTTP_304_NOT_MODIFIED,
+        ):
+            response["ETag"] = self.catalog_etag()
+            patch_cache_control(response, public=True, max_age=self.cache_max_age)
+        return response
+
+
+class StreamingServiceAccountViewSet(ReplicaReadMixin, ValuesListMixin, ModelViewSet):
 
     queryset = models.StreamingServiceAccount.objects.select_related("owner", "service")
     serializer_class = serializers.StreamingServiceAccountSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # ?stream=1 returns the whole JSON listing as one streamed array instead of a page, for
+    # superusers exporting every account in the system.
+    stream_query_param = "stream"
 
     def get_queryset(self):
         if self.request.user.is_superuser:
             return self.queryset.all()
         return self.queryset.filter(owner=self.request.user)
 
-
-class ScreenSubscriptionViewSet(ModelViewSet):
+    def list(self, request, *args, **kwargs):
+        stream = request.query_params.get(self.stream_query_param, "").lower() in ("1", "true")
+        if stream and request.accepted_renderer.format == "json":
+            return self.stream_list_response(
+                self.filter_queryset(self.get_queryset()).order_by("pk"),
+                self.get_serializer_class(),
+            )
+        return super().list(request, *args, **kwargs)
+
+    @action(
+        detail=False,
+        methods=["POST"],
+        url_path="import",
+        parser_classes=[
+            parsers.CSVStreamParser,
+            parsers.JSONLinesStreamParser,
+            parsers.JSONLStreamParser,
+            MultiPartParser,
+        ],
+    )
+    def bulk_import(self, request):
+        rows = request.data
+        if isinstance(rows, QueryDict):
+            if "file" not in rows:
+                raise ValidationError({"file": ["No file was submitted."]})
+            if "file" not in request.FILES:
+                raise ValidationError(
+                    {"file": ["The submitted data was not a file. Check the encoding type."]}
+                )
+            rows = importers.read_upload(request.FILES["file"])
+
+        report = importers.AccountImporter(owner=request.user).run(rows)
+        if report["created"]:
+            return Response(report, status=status.HTTP_201_CREATED)
+        return Response(report, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ScreenSubscriptionViewSet(ReplicaReadMixin, ValuesListMixin, ModelViewSet):
 
     queryset = models.ScreenSubscription.objects.select_related("streaming_account", "user")
     serializer_class = serializers.ScreenSubscriptionSerializer
+    pagination_class = pagination.ScreenAvailabilityPagination
 
     def get_permissions(self):
 
+        if self.action == "claim":
+            return [permissions.IsAuthenticated()]
+
         if self.request.method in permissions.SAFE_METHODS:
             return [permissions.AllowAny()]
 
@@ -48,48 +296,40 @@ class ScreenSubscriptionViewSet(ModelViewSet):
         return [permissions.IsAdminUser()]
 
     def get_queryset(self):
-
-        accounts_with_available_screens = models.StreamingServiceAccount.objects.annotate(
-            available_screens_count=Count(
-                "screen",
-                filter=Q(screen__is_active=True, screen__user__isnull=True),
-            )
-        )
-
-        accounts_with_non_zero_screens = accounts_with_available_screens.filter(
-            available_screens_count__gt=0
-        )
-
-        min_available_screens = accounts_with_non_zero_screens.aggregate(
-            min_screens=Min("available_screens_count")
-        )["min_screens"]
-
-        accounts_with_least_available_screens = accounts_with_available_screens.filter(
-            available_screens_count=min_available_screens
-        ).values_list("id", flat=True)
-
-        available_screens = (
-            models.ScreenSubscription.objects.filter(
-                is_active=True,
-                user__isnull=True,
-                streaming_account__in=accounts_with_least_available_screens,
-            )
-            .order_by("streaming_account")  # Order to get the first available one
-            .distinct("streaming_account")  # Get one screen per streaming account
+        return available_screens(self.queryset, self.request.query_params)
+
+    def get_replica_pin_keys(self):
+        # Only the availability listing is cached by version.
+        return (caching.VERSION_KEY,) if self.action == "list" else ()
+
+    def list(self, request, *args, **kwargs):
+        data = caching.cached_availability(
+            availability_params_key(request.query_params),
+            lambda: self.paginator.cached_page(
+                super(ScreenSubscriptionViewSet, self).list(request, *args, **kwargs).data
+            ),
         )
-
-        return available_screens
-
-    @action(detail=False, methods=["GET"])
+        return Response(self.paginator.linked_page(request, data))
+
+    @action(detail=False, methods=["POST"])
+    def claim(self, request):
+        service = None
+        if "service" in request.data:
+            service = get_object_or_404(models.Service, pk=request.data["service"])
+        screen = allocation.claim_screen(request.user, allocation.get_strategy(service))
+        if screen is None:
+            return Response({"detail": "No screens available."}, status=status.HTTP_409_CONFLICT)
+        serializer = self.get_serializer(screen)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=["GET"], pagination_class=pagination.MyScreensPagination)
     def my_screens(self, request):
-        user = self.request.user
-        if user.is_anonymous:
-            return Response([])
-        screens = models.ScreenSubscription.objects.filter(user=self.request.user)
-        if screens.exists:
-            serializer = serializers.ScreenSubscriptionSerializer(screens, many=True)
-            return Response(serializer.data)
-        return Response([])
+        screens = models.ScreenSubscription.objects.none()
+        if not request.user.is_anonymous:
+            screens = models.ScreenSubscription.objects.filter(user=request.user).select_related(
+                "streaming_account__service"
+            )
+        return self.values_list_response(screens, serializers.MyScreenSubscriptionSerializer)
 
 
 # class UserScreenSubscriptionViewSet(ModelViewSet):
@@ -3,14 +3,41 @@ ASGI config for comparte project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Requests are resolved with comparte.urls_async, which serves the read-heavy endpoints with
+async views and everything else with the regular sync views. With WARM_UP_WORKERS each worker
+warms up before it accepts requests, see core.startup.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "comparte.settings.development")
 
-application = get_asgi_application()
+
+class AsyncRoutesASGIHandler(ASGIHandler):
+    """ASGIHandler that resolves every request with the async URL configuration."""
+
+    urlconf = "comparte.urls_async"
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = self.urlconf
+        return request, error_response
+
+
+django.setup(set_prefix=False)
+application = AsyncRoutesASGIHandler()
+
+if settings.WARM_UP_WORKERS:
+    from core import health, startup
+
+    startup.warm_up()
+    # Checked from now on, so the first readiness probe already finds a result.
+    health.readiness.start()
@@ -36,10 +36,14 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "core",
     "rest_framework",
+    "django_filters",
     "api",
 ]
 
 MIDDLEWARE = [
+    "core.health.HealthCheckMiddleware",
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.QueryCountMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -74,6 +78,72 @@ WSGI_APPLICATION = "comparte.wsgi.application"
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 ALLOWED_HOSTS = []
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Slow query log
+# Queries over the threshold are logged with their view and stack, None turns the log off.
+# A sample of the slow SELECTs also gets its plan. ANALYZE runs the query a second time on the
+# request path, so only turn it on while diagnosing.
+
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_EXPLAIN_SAMPLE = 0.1
+SLOW_QUERY_EXPLAIN_ANALYZE = False
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "slow_queries": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": os.environ.get("DJANGO_SLOW_QUERY_LOG", "/tmp/comparte-slow-queries.log"),
+            "maxBytes": 10 * 1024 * 1024,
+            "backupCount": 5,
+            "delay": True,
+        },
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+    },
+    "loggers": {
+        "comparte.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+        "comparte.startup": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+# Seconds between the background checks of the databases reported by /readyz.
+READINESS_INTERVAL = 5
+
+# Load URL resolvers, serializers and database connections in each server worker before it
+# accepts requests, see core.startup.warm_up.
+WARM_UP_WORKERS = False
+
+# Directory where each worker writes its request metrics for /metrics, None keeps them in memory.
+METRICS_DIR = None
+
+# Read replicas
+# Aliases in DATABASES that serve the reads of safe API requests, see core.routers.
+# Users who wrote, and caches that were invalidated, read from the primary for
+# REPLICA_PIN_SECONDS afterwards, which should cover the replication lag.
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+REPLICA_DATABASES = []
+REPLICA_PIN_SECONDS = 5
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -114,9 +184,19 @@ AUTH_USER_MODEL = "core.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.CachedJWTAuthentication",
     ),
     "COERCE_DECIMAL_TO_STRING": False,
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.DefaultCursorPagination",
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 SIMPLE_JWT = {
@@ -0,0 +1,13 @@
+from .development import *
+
+# Settings for the server benchmarks: development without DEBUG, on a database file they pick.
+DEBUG = False
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != "debug_toolbar"]
+MIDDLEWARE = [item for item in MIDDLEWARE if not item.startswith("debug_toolbar.")]
+
+DATABASES["default"]["NAME"] = os.environ.get(
+    "DJANGO_BENCHMARK_DB", "/tmp/comparte-benchmark.sqlite3"
+)
+
+SLOW_QUERY_THRESHOLD_MS = None
@@ -8,8 +8,15 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
-    }
+    },
+    # A second database standing in for a read replica, used for reads when DJANGO_READ_REPLICAS
+    # names it. Nothing copies the primary into it.
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db-replica.sqlite3",
+    },
 }
+REPLICA_DATABASES = list(filter(None, os.environ.get("DJANGO_READ_REPLICAS", "").split(",")))
 
 STATIC_URL = "static/"
 
@@ -13,17 +13,49 @@ from .base import *
 DEBUG = False
 ALLOWED_HOSTS.extend(filter(None, os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",")))
 
-# Use PostgreSQL for production
+# Use PostgreSQL for production, with a pool of connections per worker (see core.pool).
+# MAX_SIZE matches the gunicorn threads; TIMEOUT stays under the gunicorn timeout.
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.backends.postgresql",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        "POOL": {
+            "MIN_SIZE": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+            "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 3)),
+        },
     }
 }
 
+# Read replicas, one per host in DB_REPLICA_HOSTS, with the credentials of the primary
+REPLICA_DATABASES = []
+for index, host in enumerate(filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(","))):
+    REPLICA_DATABASES.append(f"replica_{index + 1}")
+    DATABASES[f"replica_{index + 1}"] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+REPLICA_PIN_SECONDS = int(os.environ.get("DB_REPLICA_PIN_SECONDS", 5))
+
+# Share cached responses between workers and containers. Redis makes add and incr atomic,
+# which the availability recompute lock and the round robin cursor rely on.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("DJANGO_CACHE_URL", "redis://redis:6379/0"),
+    }
+}
+
+# Warm each worker up, filling its connection pools, before it takes traffic
+WARM_UP_WORKERS = True
+
+# Aggregate request metrics of all gunicorn workers
+METRICS_DIR = os.environ.get("DJANGO_METRICS_DIR", "/tmp/comparte-metrics")
+
 STATIC_URL = "/static/static/"
 MEDIA_URL = "/static/media/"
 MEDIA_ROOT = "/vol/web/media"
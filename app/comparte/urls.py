@@ -20,11 +20,14 @@ from django.urls import path, include
 from django.conf import settings
 import debug_toolbar
 
+from core.views import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
     path("auth/", include("djoser.urls")),
     path("auth/", include("djoser.urls.jwt")),
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,18 @@
+"""
+URL configuration of the ASGI worker.
+
+The read-heavy endpoints resolve to their async views and everything else falls through to
+the regular patterns of comparte.urls.
+"""
+
+from django.urls import path
+
+from api import async_views
+from comparte import urls
+
+urlpatterns = [
+    path("api/screens/", async_views.screens),
+    path("api/screens/my_screens/", async_views.my_screens),
+    path("api/services/", async_views.services),
+    *urls.urlpatterns,
+]
@@ -3,14 +3,24 @@ WSGI config for comparte project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
+With WARM_UP_WORKERS each worker warms up before it accepts requests, see core.startup.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 """
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "comparte.settings.development")
 
 application = get_wsgi_application()
+
+if settings.WARM_UP_WORKERS:
+    from core import health, startup
+
+    startup.warm_up()
+    # Checked from now on, so the first readiness probe already finds a result.
+    health.readiness.start()
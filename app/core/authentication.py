@@ -0,0 +1,110 @@
+"""
+JWT authentication that caches the fields of the resolved user it needs.
+"""
+
+import uuid
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Short, so a write that skips the save signals (a queryset update) is picked up soon anyway.
+TIMEOUT = 60
+
+# User fields kept in the cache: those authentication and the permission classes read.
+CACHED_FIELDS = ("is_active", "is_staff", "is_superuser")
+
+
+def version_key(user_id):
+    return f"auth:user:{user_id}:version"
+
+
+def version(user_id):
+    key = version_key(user_id)
+    current = cache.get(key)
+    if current is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        current = cache.get(key)
+    return current
+
+
+def invalidate(user_id):
+    cache.set(version_key(user_id), uuid.uuid4().hex, None)
+
+
+def invalidate_on_commit(user_id):
+    # Invalidate again on commit so a user cached mid-transaction is not kept.
+    invalidate(user_id)
+    transaction.on_commit(lambda: invalidate(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that keeps what it needs of the token's user in the cache instead of
+    querying the user per request.
+
+    Only the primary key and CACHED_FIELDS are kept, never the password hash. The user is rebuilt
+    from them with every other field deferred, so those still load from the database if a view
+    reads them. Entries carry a per-user version that the User save and delete signals bump,
+    and both are read in one cache call. The active and revoked-token checks still run on every
+    request.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = f"auth:user:{user_id}"
+        entries = cache.get_many([version_key(user_id), key])
+        # The version is read before the user, so a concurrent save can only orphan the entry.
+        current = entries.get(version_key(user_id)) or version(user_id)
+        entry = entries.get(key)
+        if entry is not None and entry["version"] == current:
+            user = self.cached_user(entry)
+        else:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            entry = self.cache_entry(user, current)
+            cache.set(key, entry, TIMEOUT)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != entry["revoke_token"]:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+    def cache_entry(self, user, current):
+        return {
+            "version": current,
+            "fields": {
+                self.user_model._meta.pk.attname: user.pk,
+                **{name: getattr(user, name) for name in CACHED_FIELDS},
+            },
+            # The value tokens are checked against, rather than the password hash itself.
+            "revoke_token": (
+                get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None
+            ),
+        }
+
+    def cached_user(self, entry):
+        fields = entry["fields"]
+        # from_db expects the values in the order of the model fields.
+        names = [
+            field.attname
+            for field in self.user_model._meta.concrete_fields
+            if field.attname in fields
+        ]
+        return self.user_model.from_db(DEFAULT_DB_ALIAS, names, [fields[name] for name in names])
@@ -0,0 +1,11 @@
+"""
+PostgreSQL backend that keeps its connections in a core.pool pool when POOL is set.
+"""
+
+from django.db.backends.postgresql import base
+
+from core.pool import PooledDatabaseMixin
+
+
+class DatabaseWrapper(PooledDatabaseMixin, base.DatabaseWrapper):
+    pass
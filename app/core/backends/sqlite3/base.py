@@ -0,0 +1,11 @@
+"""
+SQLite backend with the same pooling as core.backends.postgresql, to test it without a server.
+"""
+
+from django.db.backends.sqlite3 import base
+
+from core.pool import PooledDatabaseMixin
+
+
+class DatabaseWrapper(PooledDatabaseMixin, base.DatabaseWrapper):
+    pass
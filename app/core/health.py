@@ -0,0 +1,156 @@
+"""
+Liveness and readiness probes, answered before any other middleware.
+
+/healthz only shows the process is serving. /readyz reports the last result of a background
+thread that every READINESS_INTERVAL seconds pings the databases and looks for unapplied
+migrations, so probes never wait on the database themselves.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.http import HttpResponse
+
+from core import startup
+
+logger = logging.getLogger("comparte.health")
+LIVENESS_PATH = "/healthz"
+READINESS_PATH = "/readyz"
+# Results older than this many intervals mean the checker is stuck, likely on the database.
+STALE_AFTER_INTERVALS = 3
+
+
+class Readiness:
+    """Readiness of this process, refreshed by a daemon thread started on the first probe."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.result = None
+        self.checked_at = None
+        self.pid = None
+
+    def start(self):
+        with self.lock:
+            # Started per process: a thread of the gunicorn master does not survive the fork.
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+        threading.Thread(target=self.run, name="readiness", daemon=True).start()
+
+    def run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                # Reported as stale once the last result gets too old.
+                logger.exception("Readiness check failed")
+            time.sleep(settings.READINESS_INTERVAL)
+
+    def refresh(self):
+        databases = {}
+        for alias in (DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES):
+            databases[alias] = self.ping(alias)
+        pending = None
+        if databases[DEFAULT_DB_ALIAS]["reachable"]:
+            pending = self.pending_migrations()
+        result = {
+            "databases": databases,
+            "pending_migrations": pending,
+            "ready": all(database["reachable"] for database in databases.values()) and pending == 0,
+        }
+        with self.lock:
+            self.result = result
+            self.checked_at = time.monotonic()
+        return result
+
+    def ping(self, alias):
+        connection = connections[alias]
+        start = time.perf_counter()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except DatabaseError:
+            # Logged only: the error names internal hosts, and probes are served to anyone.
+            logger.exception("Readiness check could not reach database '%s'", alias)
+            return {"reachable": False}
+        finally:
+            # Back to its pool between checks.
+            connection.close()
+        return {"reachable": True, "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+    def pending_migrations(self):
+        # Checked every time, as migrations can be unapplied by hand.
+        try:
+            return len(startup.unapplied_migrations())
+        finally:
+            connections[DEFAULT_DB_ALIAS].close()
+
+    def report(self):
+        """The readiness status and its details, as served by /readyz."""
+        self.start()
+        with self.lock:
+            result, checked_at = self.result, self.checked_at
+        if result is None:
+            return {"status": "starting"}
+        age = time.monotonic() - checked_at
+        if age > STALE_AFTER_INTERVALS * settings.READINESS_INTERVAL:
+            status = "stale"
+        else:
+            status = "ready" if result["ready"] else "unavailable"
+        return {
+            "status": status,
+            "checked_seconds_ago": round(age, 3),
+            "databases": result["databases"],
+            "pending_migrations": result["pending_migrations"],
+        }
+
+
+readiness = Readiness()
+
+
+def probe_response(path):
+    """The response to a probe of path, or None when path is not a probe."""
+    if path == LIVENESS_PATH:
+        return json_response({"status": "ok"}, 200)
+    if path == READINESS_PATH:
+        report = readiness.report()
+        return json_response(report, 200 if report["status"] == "ready" else 503)
+    return None
+
+
+def json_response(data, status):
+    response = HttpResponse(json.dumps(data), status=status, content_type="application/json")
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+class HealthCheckMiddleware:
+    """
+    Answer /healthz and /readyz before the rest of the middleware runs.
+
+    First in MIDDLEWARE, so probes skip host validation, sessions, authentication and the
+    request metrics.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return probe_response(request.path_info) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return probe_response(request.path_info) or await self.get_response(request)
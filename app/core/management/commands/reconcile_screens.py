@@ -0,0 +1,50 @@
+"""
+Django command to reconcile the available_screens counters.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api import allocation
+
+
+class Command(BaseCommand):
+    """Django command to correct available_screens from the screens changed since last run."""
+
+    help = "Recount available_screens for accounts whose screens changed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help=(
+                "Check every account instead of starting from the stored high-water mark. "
+                "Needed after screens are moved between accounts with bulk updates."
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=allocation.RECONCILE_BATCH_SIZE,
+            help="Accounts corrected per UPDATE.",
+        )
+        parser.add_argument(
+            "--overlap",
+            type=int,
+            default=int(allocation.RECONCILE_OVERLAP.total_seconds()),
+            help="Seconds re-read before the high-water mark to catch late commits.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        result = allocation.reconcile_available_screens(
+            full=options["full"],
+            batch_size=options["batch_size"],
+            overlap=timedelta(seconds=options["overlap"]),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {result['checked']} accounts, corrected {result['corrected']} "
+                f"(high-water mark: {result['high_water_mark']})."
+            )
+        )
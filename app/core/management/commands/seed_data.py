@@ -0,0 +1,248 @@
+"""
+Django command to seed a realistic dataset for load and benchmark environments.
+"""
+
+import io
+import random
+import time
+from decimal import Decimal
+from itertools import accumulate, islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from api import models
+from api.importers import copy_value
+from core.models import User
+
+SERVICE_NAMES = [
+    "Netflix",
+    "Disney+",
+    "HBO Max",
+    "Prime Video",
+    "Spotify",
+    "YouTube Premium",
+    "Apple TV+",
+    "Paramount+",
+    "Crunchyroll",
+    "Star+",
+]
+
+# Screens per account and how common each size is.
+ACCOUNT_SIZES = [2, 3, 4, 5]
+ACCOUNT_SIZE_WEIGHTS = [2, 1, 6, 1]
+
+# Payment status of taken screens.
+PAYMENT_STATUSES = ["C", "P", "N"]
+PAYMENT_STATUS_WEIGHTS = [80, 15, 5]
+
+
+class Table:
+    """Writes rows of model in batches, as raw tuples in the model's column order."""
+
+    def __init__(self, model, batch_size):
+        self.model = model
+        self.batch_size = batch_size
+        self.fields = model._meta.concrete_fields
+        now = timezone.now()
+        self.defaults = {}
+        for field in self.fields:
+            auto_now = getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+            value = now if auto_now else field.get_default()
+            self.defaults[field.attname] = field.get_db_prep_save(value, connection)
+        self.next_id = (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+        self.written = 0
+
+    def prepare(self, attname, value):
+        return self.model._meta.get_field(attname).get_db_prep_save(value, connection)
+
+    def write(self, rows):
+        """Write rows, dicts of prepared values by attname, and return how many were written."""
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            values = [
+                [row.get(field.attname, self.defaults[field.attname]) for field in self.fields]
+                for row in batch
+            ]
+            self.insert(values)
+            self.written += len(values)
+
+    def insert(self, values):
+        quote_name = connection.ops.quote_name
+        table = quote_name(self.model._meta.db_table)
+        columns = ", ".join(quote_name(field.column) for field in self.fields)
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                buffer = io.StringIO(
+                    "".join("\t".join(copy_value(value) for value in row) + "\n" for row in values)
+                )
+                cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", buffer)
+            else:
+                placeholders = ", ".join(["%s"] * len(self.fields))
+                cursor.executemany(
+                    f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", values
+                )
+
+    def allocate_ids(self, count):
+        ids = range(self.next_id, self.next_id + count)
+        self.next_id += count
+        return ids
+
+
+class Command(BaseCommand):
+    """Django command to seed users, services, accounts and screen subscriptions."""
+
+    help = "Seed users, services, accounts and screen subscriptions with realistic skew."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--services", type=int, default=len(SERVICE_NAMES))
+        parser.add_argument("--screens", type=int, default=100_000)
+        parser.add_argument(
+            "--screens-per-account",
+            type=int,
+            help="Fixed account size instead of the usual mix of 2 to 5 screens.",
+        )
+        parser.add_argument(
+            "--taken", type=float, default=0.6, help="Share of active screens held by a user."
+        )
+        parser.add_argument(
+            "--owners", type=float, default=0.05, help="Share of users that own accounts."
+        )
+        parser.add_argument("--batch-size", type=int, default=50_000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options["users"] < 1 or options["services"] < 1:
+            raise CommandError("At least one user and one service are needed.")
+
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        batch_size = options["batch_size"]
+        self.tables = {
+            model: Table(model, batch_size)
+            for model in (
+                User,
+                models.Service,
+                models.StreamingServiceAccount,
+                models.ScreenSubscription,
+            )
+        }
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            user_ids = self.seed_users()
+            service_ids = self.seed_services()
+            self.seed_accounts(user_ids, service_ids)
+            self.reset_sequences()
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        for model, table in self.tables.items():
+            self.stdout.write(f"{model._meta.label}: {table.written} rows")
+        self.stdout.write(
+            self.style.SUCCESS(f"Seeded database in {time.perf_counter() - start:.2f}s.")
+        )
+
+    def seed_users(self):
+        table = self.tables[User]
+        user_ids = table.allocate_ids(self.options["users"])
+        table.write(
+            {
+                "id": user_id,
+                "password": "!",
+                "username": f"seed{user_id}",
+                "email": f"seed{user_id}@example.com",
+                "first_name": "Seed",
+                "last_name": f"User {user_id}",
+            }
+            for user_id in user_ids
+        )
+        return user_ids
+
+    def seed_services(self):
+        table = self.tables[models.Service]
+        service_ids = table.allocate_ids(self.options["services"])
+        table.write(
+            {
+                "id": service_id,
+                "name": SERVICE_NAMES[number % len(SERVICE_NAMES)]
+                + (f" {number // len(SERVICE_NAMES) + 1}" if number >= len(SERVICE_NAMES) else ""),
+            }
+            for number, service_id in enumerate(service_ids)
+        )
+        return service_ids
+
+    def seed_accounts(self, user_ids, service_ids):
+        """Accounts and their screens, generated together so memory stays flat."""
+        rng = self.rng
+        accounts = self.tables[models.StreamingServiceAccount]
+        screens = self.tables[models.ScreenSubscription]
+        owner_ids = user_ids[: max(int(len(user_ids) * self.options["owners"]), 1)]
+        # Zipf-like popularity: the first services get most of the accounts.
+        service_weights = list(accumulate(1 / (rank + 1) for rank in range(len(service_ids))))
+        prices = [
+            accounts.prepare("price_per_screen", Decimal(cents) / 100) for cents in range(199, 1600)
+        ]
+        fixed_size = self.options["screens_per_account"]
+        taken_share = self.options["taken"]
+        statuses = list(accumulate(PAYMENT_STATUS_WEIGHTS))
+
+        account_rows = []
+        screen_rows = []
+
+        def flush():
+            accounts.write(account_rows)
+            screens.write(screen_rows)
+            account_rows.clear()
+            screen_rows.clear()
+
+        remaining = self.options["screens"]
+        while remaining > 0:
+            size = fixed_size or rng.choices(ACCOUNT_SIZES, ACCOUNT_SIZE_WEIGHTS)[0]
+            size = min(size, remaining)
+            remaining -= size
+            (account_id,) = accounts.allocate_ids(1)
+
+            available = 0
+            for _ in range(size):
+                is_active = rng.random() >= 0.02
+                taken = is_active and rng.random() < taken_share
+                available += is_active and not taken
+                screen_rows.append(
+                    {
+                        "id": screens.allocate_ids(1)[0],
+                        "streaming_account_id": account_id,
+                        "user_id": rng.choice(user_ids) if taken else None,
+                        "is_active": is_active,
+                        "payment_status": (
+                            rng.choices(PAYMENT_STATUSES, cum_weights=statuses)[0] if taken else "N"
+                        ),
+                    }
+                )
+            account_rows.append(
+                {
+                    "id": account_id,
+                    "owner_id": rng.choice(owner_ids),
+                    "service_id": rng.choices(service_ids, cum_weights=service_weights)[0],
+                    "username": f"account{account_id}@example.com",
+                    "password": "password",
+                    "price_per_screen": rng.choice(prices),
+                    "total_screens": size,
+                    "available_screens": available,
+                    "verfied": rng.random() < 0.8,
+                }
+            )
+            if len(screen_rows) >= accounts.batch_size:
+                flush()
+        flush()
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(no_style(), list(self.tables))
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
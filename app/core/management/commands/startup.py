@@ -0,0 +1,69 @@
+"""
+Django command to get the database and static files ready before the server starts.
+"""
+
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from core import startup
+
+
+class Command(BaseCommand):
+    """Django command run by the containers before gunicorn, timing each of its phases."""
+
+    help = "Wait for the database, collect static files and migrate unless already up to date."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60.0,
+            help="Seconds to keep retrying the database before giving up.",
+        )
+        parser.add_argument("--skip-collectstatic", action="store_true")
+        parser.add_argument(
+            "--skip-migrate",
+            action="store_true",
+            help="Leave migrations to another container.",
+        )
+        parser.add_argument(
+            "--force-migrate",
+            action="store_true",
+            help="Run migrate even when every migration is applied.",
+        )
+
+    def handle(self, *args, **options):
+        self.timings = []
+        started = time.perf_counter()
+
+        try:
+            attempts = startup.wait_for_database(timeout=options["timeout"])
+        except DatabaseError as error:
+            raise CommandError(f"Database unavailable after {options['timeout']}s: {error}")
+        self.record("wait_for_db", started, f"{attempts} attempt{'s' if attempts > 1 else ''}")
+
+        if not options["skip_collectstatic"]:
+            phase_started = time.perf_counter()
+            call_command("collectstatic", interactive=False, verbosity=0)
+            self.record("collectstatic", phase_started)
+
+        if not options["skip_migrate"]:
+            phase_started = time.perf_counter()
+            unapplied = startup.unapplied_migrations()
+            if not options["force_migrate"] and not unapplied:
+                self.record("migrate", phase_started, "skipped, every migration is applied")
+            else:
+                call_command("migrate", interactive=False, verbosity=0)
+                self.record("migrate", phase_started, f"{len(unapplied)} unapplied")
+
+        for name, seconds, note in self.timings:
+            self.stdout.write(f"{name:<14} {seconds * 1000:>8.0f} ms  {note}".rstrip())
+        self.stdout.write(
+            self.style.SUCCESS(f"Ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+        )
+
+    def record(self, name, started, note=""):
+        self.timings.append((name, time.perf_counter() - started, note))
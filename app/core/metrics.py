@@ -0,0 +1,211 @@
+"""
+Request latency histograms and database pool stats shared between server worker processes.
+
+Each process keeps its histograms in memory, and a background thread writes them every
+FLUSH_INTERVAL seconds, with the stats of its connection pools, to the process's own file in
+settings.METRICS_DIR. The /metrics view sums the files of every worker, so the request path
+never touches the disk or takes a lock held by another process. Without METRICS_DIR only the
+serving process is reported. Files of workers that are no longer running are removed when
+the view reads them.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+
+from core import pool
+
+# Upper bounds in seconds, up to the 5 second gunicorn timeout.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+FLUSH_INTERVAL = 1.0
+METRIC = "comparte_request_duration_seconds"
+LABELS = ("view", "action", "method", "status")
+# (metric, type, stats key, help) of the connection pool stats, labelled by worker and alias.
+POOL_METRICS = (
+    ("comparte_db_pool_idle_connections", "gauge", "idle", "Idle connections in the pool."),
+    ("comparte_db_pool_used_connections", "gauge", "in_use", "Connections checked out."),
+    ("comparte_db_pool_max_connections", "gauge", "max_size", "Most connections the pool opens."),
+    ("comparte_db_pool_waiting", "gauge", "waiting", "Threads waiting for a connection."),
+    ("comparte_db_pool_checkouts_total", "counter", "checkouts", "Connections checked out."),
+    ("comparte_db_pool_timeouts_total", "counter", "timeouts", "Checkouts that timed out."),
+    (
+        "comparte_db_pool_health_check_failures_total",
+        "counter",
+        "health_check_failures",
+        "Idle connections closed after failing their health check.",
+    ),
+    ("comparte_db_pool_opened_total", "counter", "opened", "Connections opened."),
+    ("comparte_db_pool_closed_total", "counter", "closed", "Connections closed."),
+    (
+        "comparte_db_pool_wait_seconds_total",
+        "counter",
+        "wait_seconds",
+        "Time spent checking connections out.",
+    ),
+)
+
+
+class Registry:
+    """Latency histograms of one process, keyed by view, action, method and status."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        # Pid and start time, so a reused pid does not overwrite a dead worker's file.
+        self.name = f"{self.pid}-{time.time_ns()}.json"
+        self.histograms = {}
+        # Threads do not survive a fork, so every process starts its own.
+        self.flusher = None
+
+    def observe(self, labels, seconds):
+        """Record one request; labels is a (view, action, method, status) tuple."""
+        if self.pid != os.getpid():
+            # Forked after the first request: start over instead of double counting the parent.
+            self.reset()
+        with self.lock:
+            histogram = self.histograms.get(labels)
+            if histogram is None:
+                # One count per bucket, one for +Inf, then the sum of all observations.
+                histogram = self.histograms[labels] = [0] * (len(BUCKETS) + 1) + [0.0]
+            histogram[bisect_left(BUCKETS, seconds)] += 1
+            histogram[-1] += seconds
+            start = self.flusher is None and metrics_dir() is not None
+            if start:
+                self.flusher = threading.Thread(target=self.run, name="metrics", daemon=True)
+        if start:
+            self.flusher.start()
+
+    def run(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            return [[list(labels), histogram[:]] for labels, histogram in self.histograms.items()]
+
+    def report(self):
+        """What this process writes to its file: its histograms and connection pool stats."""
+        return {"pid": os.getpid(), "histograms": self.snapshot(), "pools": pool.stats()}
+
+    def flush(self):
+        """Write this process's report to its file in METRICS_DIR."""
+        directory = metrics_dir()
+        if directory is None or not self.flush_lock.acquire(blocking=False):
+            return
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / self.name
+            temporary = path.with_suffix(".tmp")
+            temporary.write_text(json.dumps(self.report()))
+            os.replace(temporary, path)
+        finally:
+            self.flush_lock.release()
+
+
+registry = Registry()
+
+
+def view_labels(request):
+    """The view and action a request resolved to, ("unmatched", method) when it did not."""
+    method = request.method.lower()
+    if request.resolver_match is None:
+        return ("unmatched", method)
+    # DRF viewsets expose the viewset class and the method to action mapping.
+    view_func = request.resolver_match.func
+    view = getattr(view_func, "cls", None) or view_func
+    actions = getattr(view_func, "actions", None) or {}
+    return (view.__name__, actions.get(method, method))
+
+
+def metrics_dir():
+    directory = getattr(settings, "METRICS_DIR", None)
+    return Path(directory) if directory else None
+
+
+def reports():
+    """The reports of every worker, or of this process alone without METRICS_DIR."""
+    directory = metrics_dir()
+    if directory is None:
+        return [registry.report()]
+    registry.flush()
+    worker_reports = []
+    for path in directory.glob("*.json"):
+        try:
+            report = json.loads(path.read_text())
+        except (OSError, ValueError):
+            # Replaced or removed while reading; the next scrape picks it up.
+            continue
+        if not running(report["pid"]):
+            # A worker that exited or was replaced; its pool gauges no longer exist.
+            path.unlink(missing_ok=True)
+            continue
+        worker_reports.append(report)
+    return worker_reports
+
+
+def running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Alive, owned by another user.
+        return True
+    return True
+
+
+def collect(worker_reports=None):
+    """Histograms of every worker, summed by labels."""
+    if worker_reports is None:
+        worker_reports = reports()
+    totals = {}
+    for report in worker_reports:
+        for labels, histogram in report["histograms"]:
+            total = totals.setdefault(tuple(labels), [0] * len(histogram))
+            for index, value in enumerate(histogram):
+                total[index] += value
+    return totals
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(histograms, worker_reports=()):
+    """Histograms and the pool stats of each worker in the Prometheus text exposition format."""
+    lines = [
+        f"# HELP {METRIC} Request latency by view, action, method and status code.",
+        f"# TYPE {METRIC} histogram",
+    ]
+    bounds = [repr(bound) for bound in BUCKETS] + ["+Inf"]
+    for labels, histogram in sorted(histograms.items()):
+        label_text = ",".join(f'{name}="{escape(value)}"' for name, value in zip(LABELS, labels))
+        cumulative = 0
+        for bound, count in zip(bounds, histogram):
+            cumulative += count
+            lines.append(f'{METRIC}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+        lines.append(f"{METRIC}_sum{{{label_text}}} {histogram[-1]!r}")
+        lines.append(f"{METRIC}_count{{{label_text}}} {cumulative}")
+
+    pools = sorted(
+        (report["pid"], alias, stats)
+        for report in worker_reports
+        for alias, stats in report.get("pools", {}).items()
+    )
+    if pools:
+        for metric, kind, key, description in POOL_METRICS:
+            lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {kind}"]
+            for pid, alias, stats in pools:
+                labels = f'worker="{pid}",alias="{escape(alias)}"'
+                lines.append(f"{metric}{{{labels}}} {stats[key]!r}")
+    return "\n".join(lines) + "\n"
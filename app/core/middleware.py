@@ -0,0 +1,133 @@
+"""
+Middleware for the comparte project.
+"""
+
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from core import metrics, slow_queries
+from core.queries import count_queries
+
+
+def wrap_stream(response, context, finished=None):
+    """
+    Produce each chunk of a streaming response inside context(), then call finished().
+
+    Streamed content is produced after the middleware has returned, so this keeps the queries
+    it runs attributed to its request. Async content is left as is, and finished right away.
+    """
+    if response.is_async:
+        if finished is not None:
+            finished()
+        return
+    content = response.streaming_content
+
+    def chunks():
+        iterator = iter(content)
+        try:
+            while True:
+                with context():
+                    chunk = next(iterator, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            # Also when the client goes away and the server closes the response early.
+            if finished is not None:
+                finished()
+
+    response.streaming_content = chunks()
+
+
+@contextmanager
+def serving(request):
+    """Share request with the slow query log while the block runs."""
+    token = slow_queries.current_request.set(request)
+    try:
+        yield
+    finally:
+        slow_queries.current_request.reset(token)
+
+
+class QueryCountMiddleware:
+    """
+    Count the SQL queries and database time of every request.
+
+    The counter is left on request.queries for later middleware and logging, and in DEBUG the
+    totals are also sent back as X-DB-Query-Count and X-DB-Time-Ms headers. Streaming responses
+    keep counting while their content is produced, which the headers, already sent, leave out.
+    Async views are not counted: their queries run on executor threads with connections of
+    their own.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.get_response(request)
+        with count_queries() as queries:
+            request.queries = queries
+            response = self.get_response(request)
+        if response.streaming:
+            wrap_stream(response, lambda: count_queries(counter=queries))
+        if settings.DEBUG:
+            response["X-DB-Query-Count"] = str(queries.count)
+            response["X-DB-Time-Ms"] = f"{queries.duration_ms:.2f}"
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record the latency and status code of every request in the metrics histograms.
+
+    The request is also shared with the slow query log, which labels queries with its view.
+    Streaming responses are recorded once their content has been produced.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with serving(request):
+            response = self.get_response(request)
+        return self.observe(request, response, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with serving(request):
+            response = await self.get_response(request)
+        return self.observe(request, response, start)
+
+    def observe(self, request, response, start):
+        if response.streaming:
+            wrap_stream(
+                response, lambda: serving(request), lambda: self.record(request, response, start)
+            )
+        else:
+            self.record(request, response, start)
+        return response
+
+    def record(self, request, response, start):
+        metrics.registry.observe(
+            (*metrics.view_labels(request), request.method, response.status_code),
+            time.perf_counter() - start,
+        )
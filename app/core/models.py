@@ -13,4 +13,4 @@ class User(AbstractUser):
     last_name = models.CharField(max_length=50, blank=True, null=True)
 
     def __str__(self):
-        return f'{self.first_name} {self.last_name}'
\ No newline at end of file
+        return f'{self.first_name} {self.last_name}'
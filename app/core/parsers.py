@@ -0,0 +1,31 @@
+"""
+JSON parser backed by orjson.
+"""
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from core.renderers import ORJSONRenderer, orjson
+
+
+class ORJSONParser(JSONParser):
+    """Drop-in JSONParser that decodes UTF-8 bodies with orjson when it is installed."""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        # orjson reads UTF-8 only and rejects NaN and Infinity, as STRICT_JSON does.
+        if (
+            orjson is None
+            or not self.strict
+            or encoding.lower().replace("_", "-") not in ("utf-8", "utf8")
+        ):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -0,0 +1,309 @@
+"""
+Database connection pool for the psycopg2 backend, shared by the threads of a worker.
+
+Django's own pool needs psycopg 3, so the pooled backends in core.backends keep their
+connections here instead. A database opts in with a POOL entry in its settings:
+
+    "POOL": {"MIN_SIZE": 2, "MAX_SIZE": 10, "TIMEOUT": 5, "CHECK_AFTER": 30, "IDLE_TIMEOUT": 600}
+
+Closing a connection gives it back to the pool, so the default CONN_MAX_AGE of 0 returns it
+at the end of every request. Connections idle for CHECK_AFTER seconds or more are checked with
+a query before they are handed out again; None skips the check.
+"""
+
+import collections
+import os
+import threading
+import time
+
+from django.db import OperationalError
+from django.db.backends.base.base import NO_DB_ALIAS
+
+DEFAULTS = {
+    "MIN_SIZE": 0,
+    "MAX_SIZE": 10,
+    "TIMEOUT": 5.0,
+    "CHECK_AFTER": 30.0,
+    "IDLE_TIMEOUT": 600.0,
+}
+
+
+class PoolTimeout(OperationalError):
+    """No connection was given back to an exhausted pool within its timeout."""
+
+
+class ConnectionPool:
+    """
+    Up to max_size connections, handed to one thread at a time.
+
+    A checkout takes the most recently returned idle connection, opens a new one while the pool
+    is below max_size, or waits up to timeout for one to be given back. Idle connections over
+    min_size are closed once they have been idle for idle_timeout seconds.
+    """
+
+    def __init__(self, alias, name, min_size=0, max_size=10, timeout=5.0, idle_timeout=600.0):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("Pool sizes must satisfy 0 <= MIN_SIZE <= MAX_SIZE and MAX_SIZE >= 1.")
+        self.alias = alias
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.condition = threading.Condition()
+        # (connection, returned at) pairs, the most recently returned last.
+        self.idle = collections.deque()
+        self.size = 0
+        self.waiting = 0
+        self.closed = False
+        self.counters = dict.fromkeys(
+            ("checkouts", "timeouts", "health_check_failures", "opened", "closed"), 0
+        )
+        self.wait_seconds = 0.0
+
+    def getconn(self, connect, check=None):
+        """
+        A connection from the pool, opened with connect() when none is idle.
+
+        Idle connections are passed to check() with the seconds they sat idle; it raises for one
+        that is no longer usable, which is closed, and the checkout moves on to the next one.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            connection, returned_at = self.acquire(deadline)
+            if connection is None:
+                try:
+                    connection = connect()
+                except BaseException:
+                    self.release_slot()
+                    raise
+                self.count("opened")
+                break
+            if check is None:
+                break
+            try:
+                check(connection, time.monotonic() - returned_at)
+                break
+            except Exception:
+                self.count("health_check_failures")
+                self.discard(connection)
+
+        with self.condition:
+            self.counters["checkouts"] += 1
+            self.wait_seconds += time.monotonic() - start
+        return connection
+
+    def acquire(self, deadline):
+        """
+        An idle connection and when it was returned, or (None, None) with a slot reserved for a
+        new one.
+        """
+        with self.condition:
+            self.waiting += 1
+            try:
+                while True:
+                    if self.idle:
+                        return self.idle.pop()
+                    if self.size < self.max_size:
+                        self.size += 1
+                        return None, None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"No connection to '{self.alias}' available within {self.timeout}s; "
+                            f"all {self.max_size} are in use."
+                        )
+                    self.condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+    def fill(self, connect):
+        """Open connections with connect() until the pool holds min_size of them."""
+        while True:
+            with self.condition:
+                if self.closed or self.size >= self.min_size:
+                    return
+                self.size += 1
+            try:
+                connection = connect()
+            except BaseException:
+                self.release_slot()
+                raise
+            self.count("opened")
+            self.putconn(connection)
+
+    def putconn(self, connection):
+        """Give a connection back for the next checkout."""
+        if self.closed:
+            self.discard(connection)
+            return
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            expired = self.expire()
+            self.condition.notify()
+        for connection in expired:
+            close(connection)
+            self.count("closed")
+
+    def discard(self, connection):
+        """Close a connection that must not be handed out again and free its slot."""
+        close(connection)
+        self.count("closed")
+        self.release_slot()
+
+    def release_slot(self):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def expire(self):
+        """Remove the connections idle for too long beyond min_size; called with the lock held."""
+        expired = []
+        oldest_allowed = time.monotonic() - self.idle_timeout
+        while self.size > self.min_size and self.idle and self.idle[0][1] < oldest_allowed:
+            expired.append(self.idle.popleft()[0])
+            self.size -= 1
+        return expired
+
+    def close(self):
+        """Close the idle connections; those in use are closed when they are given back."""
+        with self.condition:
+            idle = [connection for connection, _ in self.idle]
+            self.idle.clear()
+            self.size -= len(idle)
+            self.closed = True
+        for connection in idle:
+            close(connection)
+            self.count("closed")
+
+    def count(self, counter):
+        with self.condition:
+            self.counters[counter] += 1
+
+    def stats(self):
+        with self.condition:
+            return {
+                "size": self.size,
+                "idle": len(self.idle),
+                "in_use": self.size - len(self.idle),
+                "waiting": self.waiting,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self.counters,
+                "wait_seconds": self.wait_seconds,
+            }
+
+
+def close(connection):
+    try:
+        connection.close()
+    except Exception:
+        # Already broken, which is usually why it is being closed.
+        pass
+
+
+pools = {}
+pools_lock = threading.Lock()
+pools_pid = os.getpid()
+
+
+def get_pool(alias, name, options):
+    """The pool of a database alias in this process, created from its POOL settings."""
+    global pools_pid
+    with pools_lock:
+        if pools_pid != os.getpid():
+            # Forked: the parent's connections belong to the parent.
+            pools.clear()
+            pools_pid = os.getpid()
+        pool = pools.get(alias)
+        if pool is not None and pool.name != name:
+            # The database was renamed, as when the test database is created.
+            pool.close()
+            pool = None
+        if pool is None:
+            options = {**DEFAULTS, **options}
+            pool = pools[alias] = ConnectionPool(
+                alias,
+                name,
+                min_size=options["MIN_SIZE"],
+                max_size=options["MAX_SIZE"],
+                timeout=options["TIMEOUT"],
+                idle_timeout=options["IDLE_TIMEOUT"],
+            )
+        return pool
+
+
+def stats():
+    """Stats of every pool of this process, by database alias."""
+    with pools_lock:
+        current = list(pools.values()) if pools_pid == os.getpid() else []
+    return {pool.alias: pool.stats() for pool in current}
+
+
+class PooledDatabaseMixin:
+    """
+    DatabaseWrapper mixin that checks connections out of the alias's pool.
+
+    The backend still opens each connection and prepares it on every checkout, so per
+    connection settings such as the time zone are applied as usual. A connection is reset both
+    when it is given back and when it is checked out again, in case it was given back dirty.
+    """
+
+    pool = None
+
+    def pool_options(self):
+        options = self.settings_dict.get("POOL")
+        if not options or self.alias == NO_DB_ALIAS:
+            return None
+        return {**DEFAULTS, **(options if isinstance(options, dict) else {})}
+
+    def get_new_connection(self, conn_params):
+        options = self.pool_options()
+        if options is None:
+            return super().get_new_connection(conn_params)
+        pool = get_pool(self.alias, self.settings_dict["NAME"], options)
+        connection = pool.getconn(
+            lambda: super(PooledDatabaseMixin, self).get_new_connection(conn_params),
+            lambda connection, idle_seconds: self.check_pooled_connection(
+                connection, idle_seconds, options["CHECK_AFTER"]
+            ),
+        )
+        # Given back to this pool even if the alias gets a new one meanwhile.
+        self.pool = pool
+        return connection
+
+    def fill_pool(self):
+        """Open the MIN_SIZE connections of the pool ahead of the first requests."""
+        options = self.pool_options()
+        if options is None:
+            return
+        conn_params = self.get_connection_params()
+        get_pool(self.alias, self.settings_dict["NAME"], options).fill(
+            lambda: super(PooledDatabaseMixin, self).get_new_connection(conn_params)
+        )
+
+    def check_pooled_connection(self, connection, idle_seconds, check_after):
+        # A no-op without a transaction open, so this only costs a round trip on dirty ones.
+        connection.rollback()
+        # Recently used connections are trusted, sparing most checkouts the extra query.
+        if check_after is None or idle_seconds < check_after:
+            return
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        finally:
+            cursor.close()
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        pool, self.pool = self.pool, None
+        try:
+            # Whatever the request left open must not leak into the next checkout.
+            self.connection.rollback()
+        except self.Database.Error:
+            pool.discard(self.connection)
+        else:
+            pool.putconn(self.connection)
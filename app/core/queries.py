@@ -0,0 +1,45 @@
+"""
+Counting of SQL queries and database time.
+"""
+
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+class QueryCounter:
+    """Execute wrapper that counts queries and the time spent running them."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements.append(sql)
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000
+
+
+@contextmanager
+def count_queries(using=None, counter=None):
+    """
+    Count the queries run on every connection, or only on the using alias, inside the block.
+
+    A counter from an earlier block can be passed to keep adding to it.
+    """
+    counter = counter or QueryCounter()
+    aliases = [using] if using else connections
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(counter))
+        yield counter
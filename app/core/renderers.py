@@ -0,0 +1,45 @@
+"""
+JSON renderer backed by orjson.
+"""
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer that encodes with orjson when it is installed.
+
+    Decimals, datetimes and anything else orjson does not encode the way DRF does are handed to
+    the DRF encoder's default(), so COERCE_DECIMAL_TO_STRING=False still renders numbers and
+    datetimes keep DRF's format. Indented, ASCII-only or non-compact output, and anything
+    orjson rejects, go through the stdlib renderer.
+    """
+
+    if orjson is not None:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except orjson.JSONEncodeError:
+            # Integers over 64 bits, for instance.
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escape \u2028 and \u2029 like JSONRenderer so the output stays a JavaScript subset.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
@@ -0,0 +1,57 @@
+"""
+Database router that sends the reads of safe API requests to the read replicas.
+
+Views opt in per request through read_replica. Reads stay on the primary for whatever was
+pinned within settings.REPLICA_PIN_SECONDS, long enough for the replicas to catch up: the
+users who just wrote, and the cached listings that were just invalidated.
+"""
+
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Set by the views while serving a request whose reads may come from a replica.
+read_replica = ContextVar("read_replica", default=False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.REPLICA_DATABASES
+        if not replicas or not read_replica.get():
+            return None
+        # Reads in a transaction must see its writes.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(replicas)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary.
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def pin(key):
+    """Keep the reads guarded by key on the primary for the next REPLICA_PIN_SECONDS."""
+    if settings.REPLICA_DATABASES:
+        cache.set(f"replica:pin:{key}", True, settings.REPLICA_PIN_SECONDS)
+
+
+def pinned(keys):
+    if not settings.REPLICA_DATABASES or not keys:
+        return False
+    return bool(cache.get_many([f"replica:pin:{key}" for key in keys]))
+
+
+async def apinned(keys):
+    if not settings.REPLICA_DATABASES or not keys:
+        return False
+    return bool(await cache.aget_many([f"replica:pin:{key}" for key in keys]))
+
+
+def user_key(user):
+    return f"user:{user.pk}"
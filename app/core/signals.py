@@ -0,0 +1,14 @@
+"""
+Core Signals
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import authentication
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    authentication.invalidate_on_commit(instance.pk)
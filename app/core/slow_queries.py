@@ -0,0 +1,121 @@
+"""
+Log of slow SQL queries, with the view that ran them and a sample of their plans.
+"""
+
+import logging
+import random
+import time
+import traceback
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+from core import metrics
+
+logger = logging.getLogger("comparte.slow_queries")
+
+# Request being served, set by the metrics middleware.
+current_request = ContextVar("current_request", default=None)
+# Set while a plan is captured, so the EXPLAIN itself is not timed or explained.
+explaining = ContextVar("explaining", default=False)
+
+STACK_LIMIT = 6
+PROJECT_DIR = str(Path(__file__).resolve().parent.parent)
+
+
+class SlowQueryLogger:
+    """Execute wrapper that logs queries slower than the threshold, explaining a sample of them."""
+
+    def __init__(self, connection, threshold_ms=None, explain_sample=None, explain_analyze=None):
+        self.connection = connection
+        self.threshold = (
+            settings.SLOW_QUERY_THRESHOLD_MS if threshold_ms is None else threshold_ms
+        ) / 1000
+        self.explain_sample = (
+            settings.SLOW_QUERY_EXPLAIN_SAMPLE if explain_sample is None else explain_sample
+        )
+        self.explain_analyze = (
+            settings.SLOW_QUERY_EXPLAIN_ANALYZE if explain_analyze is None else explain_analyze
+        )
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - start
+        if duration >= self.threshold and not explaining.get():
+            self.log(sql, params, many, duration)
+        return result
+
+    def log(self, sql, params, many, duration):
+        request = current_request.get()
+        view = metrics.view_labels(request) if request is not None else None
+        plan = None
+        if not many and self.should_explain(sql):
+            plan = self.explain(sql, params)
+        logger.warning(
+            "Slow query (%.1f ms) in %s on %s\n%s\nStack:\n%s%s",
+            duration * 1000,
+            ".".join(view) if view else "no view",
+            self.connection.alias,
+            sql,
+            stack_summary(),
+            f"\nPlan:\n{plan}" if plan else "",
+            extra={
+                "duration_ms": duration * 1000,
+                "view": view,
+                "alias": self.connection.alias,
+                "sql": sql,
+            },
+        )
+
+    def should_explain(self, sql):
+        return (
+            sql.lstrip()[:6].upper() == "SELECT"
+            and self.explain_sample > 0
+            and random.random() < self.explain_sample
+        )
+
+    def explain(self, sql, params):
+        options = {}
+        # ANALYZE runs the query again, which must not take row locks a second time.
+        if self.explain_analyze and "FOR UPDATE" not in sql.upper():
+            options["analyze"] = True
+        token = explaining.set(True)
+        try:
+            prefix = self.connection.ops.explain_query_prefix(**options)
+            # In a savepoint, so a failed EXPLAIN does not abort the caller's transaction.
+            with transaction.atomic(using=self.connection.alias):
+                with self.connection.cursor() as cursor:
+                    cursor.execute(f"{prefix} {sql}", params)
+                    return "\n".join(
+                        " ".join(str(column) for column in row) for row in cursor.fetchall()
+                    )
+        except Exception as error:
+            # A plan is a nice to have; the query itself already succeeded.
+            return f"EXPLAIN failed: {error}"
+        finally:
+            explaining.reset(token)
+
+
+def stack_summary():
+    """The innermost frames of project code that led to the query."""
+    frames = [
+        frame
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(PROJECT_DIR)
+        and "site-packages" not in frame.filename
+        and frame.filename != __file__
+    ]
+    return "".join(traceback.format_list(frames[-STACK_LIMIT:])) or "  (no project frames)\n"
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver that adds the slow query logger to new connections."""
+    if settings.SLOW_QUERY_THRESHOLD_MS is None:
+        return
+    # Fired again on every reconnect of the same connection object.
+    if any(isinstance(wrapper, SlowQueryLogger) for wrapper in connection.execute_wrappers):
+        return
+    connection.execute_wrappers.append(SlowQueryLogger(connection))
@@ -0,0 +1,139 @@
+"""
+Container startup: waiting for the database, finding unapplied migrations and worker warm-up.
+"""
+
+import importlib.util
+import logging
+import pkgutil
+import random
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+from django.urls import get_resolver
+
+logger = logging.getLogger("comparte.startup")
+
+# Delays in seconds between attempts to reach the database, before jitter.
+BACKOFF_BASE = 0.1
+BACKOFF_CAP = 5.0
+
+
+def backoff_delays(base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Exponential delays with full jitter, so restarted containers do not retry in step."""
+    attempt = 0
+    while True:
+        yield random.uniform(0, min(cap, base * 2**attempt))
+        attempt += 1
+
+
+def wait_for_database(alias=DEFAULT_DB_ALIAS, timeout=60.0, sleep=time.sleep):
+    """Connect to the database, retrying with backoff until timeout; returns the attempts."""
+    deadline = time.monotonic() + timeout
+    attempts = 0
+    for delay in backoff_delays():
+        attempts += 1
+        try:
+            connections[alias].ensure_connection()
+            return attempts
+        except DatabaseError:
+            if time.monotonic() + delay > deadline:
+                raise
+        sleep(delay)
+
+
+def migration_names():
+    """
+    (app label, name) of the migration files of every installed app.
+
+    The files are listed, not imported, so this is much cheaper than building the migration
+    graph.
+    """
+    names = set()
+    for app_config in apps.get_app_configs():
+        module_name, _ = MigrationLoader.migrations_module(app_config.label)
+        try:
+            spec = importlib.util.find_spec(module_name) if module_name else None
+        except ModuleNotFoundError:
+            spec = None
+        if spec is None or not spec.submodule_search_locations:
+            continue
+        for _, name, is_package in pkgutil.iter_modules(spec.submodule_search_locations):
+            # Skipped by the migration loader too.
+            if not is_package and name[0] not in "_~":
+                names.add((app_config.label, name))
+    return names
+
+
+def unapplied_migrations(alias=DEFAULT_DB_ALIAS):
+    """
+    The migrations on disk that the database has not applied, in one query.
+
+    Compared with what is applied rather than with what was last migrated, so migrations
+    unapplied by hand are found too.
+    """
+    try:
+        # Queried directly: applied_migrations() introspects the tables first.
+        applied = set(MigrationRecorder(connections[alias]).migration_qs.values_list("app", "name"))
+    except DatabaseError:
+        # No migration table: nothing was ever applied.
+        applied = set()
+    return sorted(migration_names() - applied)
+
+
+def warm_up():
+    """
+    Load what the first requests of a worker would otherwise pay for, returning the seconds
+    each step took.
+
+    Errors are logged rather than raised: a worker that failed to warm up still serves.
+    """
+    from api import serializers
+    from api.urls import router
+
+    timings = {}
+
+    start = time.perf_counter()
+    try:
+        for urlconf in (settings.ROOT_URLCONF, "comparte.urls_async"):
+            resolver = get_resolver(urlconf)
+            # Compiles every pattern and builds the reverse lookup tables.
+            resolver.reverse_dict
+    except Exception:
+        logger.exception("Warming up the URL resolvers failed")
+    timings["urls"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        for _, viewset, _ in router.registry:
+            serializer_class = viewset.serializer_class
+            # Building the fields fills the model _meta caches; the values serializer is kept.
+            serializer_class().fields
+            serializers.values_serializer(serializer_class)
+    except Exception:
+        logger.exception("Warming up the serializers failed")
+    timings["serializers"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for alias in (DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES):
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+            if hasattr(connection, "fill_pool"):
+                connection.fill_pool()
+        except Exception:
+            logger.exception("Connecting to database '%s' failed", alias)
+        finally:
+            # Back to the pool if there is one, or closed until the first request.
+            connection.close()
+    timings["databases"] = time.perf_counter() - start
+
+    logger.info(
+        "Worker warmed up in %.0f ms (%s)",
+        sum(timings.values()) * 1000,
+        ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()),
+    )
+    return timings
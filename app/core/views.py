@@ -1,3 +1,14 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from core import metrics
+
+
+@require_GET
+def metrics_view(request):
+    """Request latency histograms and pool stats of all workers in the Prometheus text format."""
+    reports = metrics.reports()
+    return HttpResponse(
+        metrics.render(metrics.collect(reports), reports),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
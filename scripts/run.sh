@@ -3,14 +3,12 @@
 # Exit immediately if a command exits with a non-zero status.
 set -e
 
-# Wait for the database to be ready before continuing.
-python manage.py wait_for_db
+# Wait for the database with backoff, collect static files and apply pending migrations,
+# skipping migrate when the database has applied every migration on disk.
+python manage.py startup
 
-# Collect static files (CSS, JS, etc.) without prompting for input.
-python manage.py collectstatic --noinput
-
-# Apply any pending database migrations.
-python manage.py migrate
+# Drop request metrics left by the workers of a previous run.
+rm -rf "${DJANGO_METRICS_DIR:-/tmp/comparte-metrics}"
 
 # Start the uWSGI server with 4 worker processes, using the WSGI module.
 # --socket :9000: Binds to port 9000.